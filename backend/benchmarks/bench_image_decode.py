@@ -0,0 +1,73 @@
+"""
+Benchmark: full decode + resize vs. reduced-resolution decode for phone photos.
+
+Run from the backend directory:
+    python benchmarks/bench_image_decode.py [megapixels]
+"""
+import io
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ocr import OCR_MAX_DIM, _open_image_reduced  # noqa: E402
+
+
+def make_photo(megapixels: float) -> bytes:
+    """Synthetic noisy JPEG roughly the size of a phone photo."""
+    w = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    h = int(w * 3 / 4)
+    rng = np.random.default_rng(0)
+    small = rng.integers(0, 255, (h // 8, w // 8, 3), dtype=np.uint8)
+    img = Image.fromarray(small).resize((w, h), Image.NEAREST)
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def full_decode(file_bytes: bytes) -> Image.Image:
+    """Previous behaviour: decode at full size, then LANCZOS down to OCR size."""
+    img = Image.open(io.BytesIO(file_bytes))
+    img.load()
+    w, h = img.size
+    scale = OCR_MAX_DIM / max(w, h)
+    return img.resize((int(w * scale), int(h * scale)), Image.LANCZOS)
+
+
+def decoded_bytes(file_bytes: bytes, reduced: bool) -> int:
+    img = Image.open(io.BytesIO(file_bytes))
+    if reduced:
+        w, h = img.size
+        scale = OCR_MAX_DIM / max(w, h)
+        img.draft("L", (int(w * scale), int(h * scale)))
+    img.load()
+    return img.width * img.height * len(img.getbands())
+
+
+def bench(fn, file_bytes: bytes, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(file_bytes)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    megapixels = float(sys.argv[1]) if len(sys.argv) > 1 else 24
+    photo = make_photo(megapixels)
+    print(f"Input: {megapixels:.0f} MP JPEG, {len(photo) / 1e6:.1f} MB")
+
+    t_full = bench(full_decode, photo)
+    t_reduced = bench(_open_image_reduced, photo)
+    m_full = decoded_bytes(photo, reduced=False)
+    m_reduced = decoded_bytes(photo, reduced=True)
+
+    print(f"{'':<18}{'time (ms)':>12}{'decoded (MB)':>15}")
+    print(f"{'full decode':<18}{t_full * 1000:>12.1f}{m_full / 1e6:>15.1f}")
+    print(f"{'reduced decode':<18}{t_reduced * 1000:>12.1f}{m_reduced / 1e6:>15.1f}")
+    print(f"Speed-up {t_full / t_reduced:.1f}x, decoded buffer {m_full / m_reduced:.1f}x smaller")
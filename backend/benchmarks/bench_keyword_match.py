@@ -0,0 +1,71 @@
+"""
+Benchmark: per-keyword substring loops vs. the Aho-Corasick KeywordMatcher.
+
+Run from the backend directory:
+    python benchmarks/bench_keyword_match.py [repeat]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filters import ACTION_CATEGORIES  # noqa: E402
+from keywords import KeywordMatcher  # noqa: E402
+
+ACTIONS = [
+    "Ravi stabbed the victim near the temple gate",
+    "The accused fled towards the river after the incident",
+    "അവൻ കത്തിയുമായി വീട്ടിൽ നിന്ന് ഓടി",
+    "राम मौके पर मौजूद नहीं था",
+    "குற்றவாளி கத்தியுடன் வீட்டுக்குள் நுழைந்தார்",
+    "The witness spoke to the neighbour about the weather",
+]
+
+
+def loop_match(table, text):
+    """Previous behaviour of get_action_category, over every language."""
+    act = text.lower()
+    for category, by_language in table.items():
+        if any(k in act for keywords in by_language.values() for k in keywords):
+            return category
+    return "other"
+
+
+def synthetic_table(n_keywords, n_categories=20):
+    rng = random.Random(0)
+    alphabet = "abcdefghijklmnopqrstuvwxyz"
+    table = {f"cat{c}": {"en": []} for c in range(n_categories)}
+    for i in range(n_keywords):
+        word = "".join(rng.choice(alphabet) for _ in range(rng.randint(4, 12)))
+        table[f"cat{i % n_categories}"]["en"].append(word)
+    return table
+
+
+def bench(fn, texts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            fn(text)
+    return (time.perf_counter() - start) / (repeat * len(texts))
+
+
+def report(label, table, texts, repeat):
+    start = time.perf_counter()
+    matcher = KeywordMatcher(table)
+    build = time.perf_counter() - start
+    for text in texts:
+        assert matcher.first(text, "other") == loop_match(table, text), text
+    t_loop = bench(lambda t: loop_match(table, t), texts, repeat)
+    t_matcher = bench(lambda t: matcher.first(t, "other"), texts, repeat)
+    print(f"{label:<24}{matcher.keyword_count:>9}{build * 1000:>11.1f}"
+          f"{t_loop * 1e6:>12.1f}{t_matcher * 1e6:>12.1f}{t_loop / t_matcher:>9.1f}x")
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"{'table':<24}{'keywords':>9}{'build (ms)':>11}{'loop (us)':>12}{'matcher (us)':>12}{'speed-up':>10}")
+    report("action categories", ACTION_CATEGORIES, ACTIONS, repeat)
+    for n in (1_000, 10_000, 50_000):
+        report("synthetic", synthetic_table(n), ACTIONS, max(repeat // (n // 1000), 3))
@@ -0,0 +1,60 @@
+"""
+Benchmark: langdetect vs. the script-histogram detector in translation.py.
+
+Run from the backend directory:
+    python benchmarks/bench_language_detect.py [repeat]
+"""
+import os
+import sys
+import time
+
+from langdetect import DetectorFactory, detect_langs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from translation import detect_language, detect_language_with_confidence  # noqa: E402
+
+DetectorFactory.seed = 0
+
+SAMPLES = {
+    "en": "The witness stated that the accused entered the house at 9 pm and left with a bag. ",
+    "hi": "गवाह ने कहा कि आरोपी रात 9 बजे घर में घुसा और एक थैला लेकर निकल गया। ",
+    "ml": "പ്രതി രാത്രി 9 മണിക്ക് വീട്ടിൽ കയറി ഒരു ബാഗുമായി പോയി എന്ന് സാക്ഷി പറഞ്ഞു. ",
+    "ta": "குற்றவாளி இரவு 9 மணிக்கு வீட்டுக்குள் நுழைந்து ஒரு பையுடன் வெளியேறினார் என்று சாட்சி கூறினார். ",
+    "te": "నిందితుడు రాత్రి 9 గంటలకు ఇంట్లోకి ప్రవేశించి ఒక సంచితో వెళ్లిపోయాడని సాక్షి చెప్పాడు. ",
+    "kn": "ಆರೋಪಿ ರಾತ್ರಿ 9 ಗಂಟೆಗೆ ಮನೆಗೆ ನುಗ್ಗಿ ಒಂದು ಚೀಲದೊಂದಿಗೆ ಹೊರಟುಹೋದನು ಎಂದು ಸಾಕ್ಷಿ ಹೇಳಿದರು. ",
+    "bn": "সাক্ষী বলেছেন যে অভিযুক্ত রাত ৯টায় বাড়িতে ঢুকে একটি ব্যাগ নিয়ে চলে যায়। ",
+}
+
+
+def langdetect_top(text: str) -> str:
+    """Previous behaviour of _detect_language_summary."""
+    return detect_langs(text)[0].lang
+
+
+def bench(fn, text: str, repeat: int) -> float:
+    fn(text)  # warm-up (langdetect loads its profiles on first use)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(text)
+    return (time.perf_counter() - start) / repeat
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    start = time.perf_counter()
+    langdetect_top("warm up the profile loader")
+    print(f"langdetect first call (profile load): {(time.perf_counter() - start) * 1000:.0f} ms\n")
+
+    print(f"{'lang':<6}{'chars':>7}{'langdetect (us)':>17}{'script (us)':>13}{'summary (us)':>14}  result")
+    for code, sentence in SAMPLES.items():
+        text = sentence * 6  # about the 500-character prefix used by /analyze
+        t_old = bench(langdetect_top, text, repeat)
+        t_new = bench(detect_language, text, repeat)
+        t_summary = bench(detect_language_with_confidence, text, repeat)
+        lang, prob = detect_language_with_confidence(text)
+        print(
+            f"{code:<6}{len(text):>7}{t_old * 1e6:>17.0f}{t_new * 1e6:>13.0f}{t_summary * 1e6:>14.0f}"
+            f"  {detect_language(text)} / {lang} ({prob:.2f})"
+        )
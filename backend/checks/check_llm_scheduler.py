@@ -0,0 +1,190 @@
+"""
+Correctness check for llm.LLMScheduler against a fake LLM: no network, no API key.
+
+A local FakeLLM injects latency and transient errors (429/503), and each
+scenario checks one scheduler behaviour: priority order, 429 backoff with
+the shared admission pause, and the circuit breaker opening, half-opening
+and closing. Exits non-zero if any check fails.
+
+Run from the backend directory:
+    python checks/check_llm_scheduler.py
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm import (  # noqa: E402
+    LLMScheduler,
+    LLMUnavailableError,
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    llm_priority,
+)
+
+random.seed(0)
+failed_checks: List[str] = []
+
+
+def check(name: str, condition: bool, detail: str = "") -> None:
+    print(f"  {'ok  ' if condition else 'FAIL'} {name}{f' ({detail})' if detail else ''}")
+    if not condition:
+        failed_checks.append(name)
+
+
+class FakeLLMError(Exception):
+    """Carries an HTTP status as `code`, like google.api_core exceptions."""
+
+    def __init__(self, code: int):
+        super().__init__(f"fake HTTP {code}")
+        self.code = code
+
+
+class FakeLLM:
+    """
+    Answers after `latency` seconds. `errors` holds the status codes to fail
+    the next calls with (None = succeed); once it is used up, every call
+    fails with `default_error`, or succeeds if that is None.
+    """
+
+    def __init__(self, latency: float = 0.01, errors: Optional[list] = None, default_error: Optional[int] = None):
+        self.latency = latency
+        self.errors = list(errors or [])
+        self.default_error = default_error
+        self.calls = 0
+        self.started: List[tuple] = []  # (label, time)
+
+    def call(self, label: str = ""):
+        async def _call() -> str:
+            self.calls += 1
+            self.started.append((label, time.monotonic()))
+            await asyncio.sleep(self.latency)
+            error = self.errors.pop(0) if self.errors else self.default_error
+            if error is not None:
+                raise FakeLLMError(error)
+            return f"answer {label}"
+        return _call
+
+
+def make_scheduler(**overrides) -> LLMScheduler:
+    settings = dict(
+        rpm=0, tpm=0, max_concurrency=4, call_timeout=5, max_retries=3,
+        backoff_base=0.05, backoff_max=0.2, breaker_failures=100, breaker_cooldown=0.3,
+    )
+    settings.update(overrides)
+    return LLMScheduler(**settings)
+
+
+async def scenario_priority() -> None:
+    print("priority order")
+    scheduler = make_scheduler(max_concurrency=1)
+    llm = FakeLLM(latency=0.05)
+
+    async def submit(label: str, priority: int) -> None:
+        llm_priority.set(priority)
+        await scheduler.run(llm.call(label), tokens=10)
+
+    blocker = asyncio.create_task(submit("blocker", PRIORITY_INTERACTIVE))
+    await asyncio.sleep(0.01)  # blocker holds the only slot; the rest queue
+    queued = [
+        ("bg-1", PRIORITY_BACKGROUND),
+        ("bg-2", PRIORITY_BACKGROUND),
+        ("ui-1", PRIORITY_INTERACTIVE),
+        ("ui-2", PRIORITY_INTERACTIVE),
+    ]
+    tasks = []
+    for label, priority in queued:
+        tasks.append(asyncio.create_task(submit(label, priority)))
+        await asyncio.sleep(0.001)  # fix arrival order
+    await asyncio.gather(blocker, *tasks)
+
+    order = [label for label, _ in llm.started]
+    expected = ["blocker", "ui-1", "ui-2", "bg-1", "bg-2"]
+    check("interactive calls overtake queued background calls", order == expected, " > ".join(order))
+
+
+async def scenario_rate_limit() -> None:
+    print("429 backoff and pause")
+    scheduler = make_scheduler(backoff_base=0.2, backoff_max=0.5)
+    llm = FakeLLM(latency=0.02, errors=[429, 429])
+    healthy = FakeLLM(latency=0.02)
+
+    first = asyncio.create_task(scheduler.run(llm.call("retried"), tokens=10))
+    while scheduler.rate_limited == 0:
+        await asyncio.sleep(0.001)
+    paused_until = scheduler._paused_until
+    other = asyncio.create_task(scheduler.run(healthy.call("other"), tokens=10))
+    results = await asyncio.gather(first, other)
+
+    other_start = healthy.started[0][1]
+    check("call succeeds after two 429s", results[0] == "answer retried" and llm.calls == 3, f"attempts={llm.calls}")
+    check("each 429 counted and retried", scheduler.rate_limited == 2 and scheduler.retries == 2,
+          f"rate_limited={scheduler.rate_limited} retries={scheduler.retries}")
+    check("other callers wait out the pause", other_start >= paused_until,
+          f"started {other_start - paused_until:+.3f}s after pause end")
+
+    exhausted = make_scheduler(max_retries=2)
+    llm = FakeLLM(latency=0.01, default_error=429)
+    try:
+        await exhausted.run(llm.call("doomed"), tokens=10)
+        raised = False
+    except LLMUnavailableError:
+        raised = True
+    check("exhausted retries raise LLMUnavailableError", raised and llm.calls == 3, f"attempts={llm.calls}")
+
+
+async def run_quietly(scheduler: LLMScheduler, call) -> Optional[str]:
+    try:
+        return await scheduler.run(call, tokens=10)
+    except LLMUnavailableError:
+        return None
+
+
+async def scenario_breaker() -> None:
+    print("circuit breaker")
+    scheduler = make_scheduler(max_retries=0, breaker_failures=3, breaker_cooldown=0.3)
+    llm = FakeLLM(latency=0.01, default_error=503)
+
+    for _ in range(3):
+        await run_quietly(scheduler, llm.call("failing"))
+    check("opens after consecutive failures", scheduler.stats()["breaker"] == "open")
+
+    calls_before = llm.calls
+    result = await run_quietly(scheduler, llm.call("rejected"))
+    check("open circuit fails fast without calling the LLM",
+          result is None and llm.calls == calls_before and scheduler.rejected == 1)
+
+    await asyncio.sleep(0.35)
+    check("half-open after the cooldown", scheduler.stats()["breaker"] == "half-open")
+    calls_before = llm.calls
+    await run_quietly(scheduler, llm.call("trial"))
+    check("failed trial call re-opens the circuit",
+          llm.calls == calls_before + 1 and scheduler.stats()["breaker"] == "open")
+
+    await asyncio.sleep(0.35)
+    llm.default_error = None  # the LLM recovers
+    llm.latency = 0.05
+    calls_before = llm.calls
+    results = await asyncio.gather(
+        run_quietly(scheduler, llm.call("trial")),
+        run_quietly(scheduler, llm.call("concurrent")),
+    )
+    check("only one trial call while half-open",
+          llm.calls == calls_before + 1 and results == ["answer trial", None], str(results))
+    check("successful trial closes the circuit", scheduler.stats()["breaker"] == "closed")
+    check("calls flow again once closed", await run_quietly(scheduler, llm.call("after")) == "answer after")
+
+
+async def main() -> None:
+    for scenario in (scenario_priority, scenario_rate_limit, scenario_breaker):
+        await scenario()
+    print(f"\n{len(failed_checks)} failed check(s)" if failed_checks else "\nall checks passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+    sys.exit(1 if failed_checks else 0)
@@ -1,26 +1,58 @@
+import asyncio
 import json
-import google.generativeai as genai
+from typing import Callable, Dict, List, Optional, Tuple
 from schemas import Event, ComparisonResult
-from config import GEMINI_API_KEY, GEMINI_MODEL_NAME
-from prompts import COMPARISON_PROMPT
+from config import (
+    GEMINI_API_KEY,
+    COMPARISON_CONCURRENCY,
+    COMPARISON_MODE,
+    COMPARISON_BATCH_TOKEN_BUDGET,
+    COMPARISON_BATCH_MAX_PAIRS,
+)
+from prompts import COMPARISON_PROMPT, BATCH_COMPARISON_PROMPT, BATCH_COMPARISON_PAIR_TEMPLATE
 from filters import comparison_cache, get_cache_key
+from llm import generate_text, clean_json_response, estimate_tokens, gather_or_cancel, LLMUnavailableError
+
+def _comparison_fields(event1: Event, event2: Event) -> dict:
+    """Prompt placeholders describing one event pair."""
+    return dict(
+        type_1=event1.statement_type,
+        actor_1=event1.actor,
+        action_1=event1.action,
+        target_1=event1.target,
+        time_1=event1.time,
+        location_1=event1.location,
+        type_2=event2.statement_type,
+        actor_2=event2.actor,
+        action_2=event2.action,
+        target_2=event2.target,
+        time_2=event2.time,
+        location_2=event2.location
+    )
 
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
 
-async def compare_events(event1: Event, event2: Event) -> ComparisonResult:
+def _cached_comparison(event1: Event, event2: Event) -> Optional[ComparisonResult]:
     # --- OBJECTIVE 4: RATE LIMIT & DEDUPLICATION (CACHE) ---
     cache_key = get_cache_key(event1, event2)
-    if cache_key in comparison_cache:
-        print(f"DEBUG: Cache Hit for {cache_key}")
-        cached_result = comparison_cache[cache_key]
-        # Return a copy with correct IDs
-        return ComparisonResult(
-            event_1_id=event1.event_id,
-            event_2_id=event2.event_id,
-            classification=cached_result.classification,
-            explanation=cached_result.explanation
-        )
+    cached_result = comparison_cache.get(cache_key)
+    if cached_result is None:
+        return None
+    print(f"DEBUG: Cache Hit for {event1.event_id} vs {event2.event_id}")
+    # Return a copy with correct IDs
+    return ComparisonResult(
+        event_1_id=event1.event_id,
+        event_2_id=event2.event_id,
+        classification=cached_result.classification,
+        explanation=cached_result.explanation
+    )
+
+
+async def compare_events(event1: Event, event2: Event, use_cache: bool = True) -> ComparisonResult:
+    if use_cache:
+        cached_result = _cached_comparison(event1, event2)
+        if cached_result is not None:
+            return cached_result
+    cache_key = get_cache_key(event1, event2)
 
     if not GEMINI_API_KEY:
         return ComparisonResult(
@@ -30,41 +62,16 @@ async def compare_events(event1: Event, event2: Event) -> ComparisonResult:
             explanation="Mock consistency check (No API Key)"
         )
 
-    model = genai.GenerativeModel(GEMINI_MODEL_NAME)
-    
     print(f"DEBUG: Comparing Event {event1.event_id} vs {event2.event_id}")
     
-    prompt = COMPARISON_PROMPT.format(
-        type_1=event1.statement_type,
-        actor_1=event1.actor,
-        action_1=event1.action,
-        target_1=event1.target,
-        time_1=event1.time,
-        location_1=event1.location,
-        type_2=event2.statement_type,
-        actor_2=event2.actor,
-        action_2=event2.action,
-        target_2=event2.target,
-        time_2=event2.time,
-        location_2=event2.location
-    )
+    prompt = COMPARISON_PROMPT.format(**_comparison_fields(event1, event2))
 
     try:
-        response = model.generate_content(
-            prompt,
-            generation_config={"response_mime_type": "application/json"}
-        )
-        print(f"DEBUG: Comparison LLM Response: {response.text}")
+        raw_text = await generate_text(prompt, json_mode=True)
+        print(f"DEBUG: Comparison LLM Response: {raw_text}")
         
         # Clean response
-        response_text = response.text.strip()
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.startswith("```"):
-            response_text = response_text[3:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-        response_text = response_text.strip()
+        response_text = clean_json_response(raw_text)
         
         result_json = json.loads(response_text)
         
@@ -76,9 +83,12 @@ async def compare_events(event1: Event, event2: Event) -> ComparisonResult:
         )
         
         # Save to cache
-        comparison_cache[cache_key] = result
+        comparison_cache.set(cache_key, result)
         return result
 
+    except LLMUnavailableError:
+        # Quota exhausted or LLM down: never pass this off as "consistent".
+        raise
     except json.JSONDecodeError as je:
         print(f"JSON Decode Error during comparison: {je}")
         return ComparisonResult(
@@ -100,3 +110,164 @@ async def compare_events(event1: Event, event2: Event) -> ComparisonResult:
             classification="consistent",
             explanation="Skipped analysis due to LLM error; treating as consistent for stability."
         )
+
+
+def _format_pair_block(position: int, event1: Event, event2: Event) -> str:
+    return BATCH_COMPARISON_PAIR_TEMPLATE.format(
+        index=position,
+        event_1_id=event1.event_id,
+        event_2_id=event2.event_id,
+        **_comparison_fields(event1, event2)
+    )
+
+
+def _build_batches(
+    pairs: List[Tuple[Event, Event]],
+    indices: List[int],
+    token_budget: int = COMPARISON_BATCH_TOKEN_BUDGET,
+    max_pairs: int = COMPARISON_BATCH_MAX_PAIRS,
+) -> List[List[int]]:
+    """
+    Greedily packs the given pair indices into batches whose formatted pairs
+    stay within the token budget and the per-batch pair limit.
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+    for index in indices:
+        block_tokens = estimate_tokens(_format_pair_block(len(current) + 1, *pairs[index]))
+        if current and (current_tokens + block_tokens > token_budget or len(current) >= max_pairs):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += block_tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+async def compare_event_batch(pairs: List[Tuple[Event, Event]]) -> Dict[int, ComparisonResult]:
+    """
+    Classifies several event pairs with a single LLM call.
+    Returns results keyed by position in `pairs`; pairs the response omits
+    or malforms are simply absent so the caller can fall back to per-pair calls.
+    """
+    id_to_index: Dict[Tuple[str, str], int] = {}
+    blocks = []
+    for index, (event1, event2) in enumerate(pairs):
+        key = (event1.event_id, event2.event_id)
+        if key in id_to_index:
+            # Ambiguous IDs cannot be matched back reliably; compare per pair.
+            continue
+        id_to_index[key] = index
+        blocks.append(_format_pair_block(len(blocks) + 1, event1, event2))
+
+    prompt = BATCH_COMPARISON_PROMPT.format(pairs="".join(blocks))
+    print(f"DEBUG: Batch comparing {len(blocks)} pairs in one call")
+
+    try:
+        raw_text = await generate_text(prompt, json_mode=True)
+        result_json = json.loads(clean_json_response(raw_text))
+    except LLMUnavailableError:
+        # Falling back to per-pair calls would only multiply failing requests.
+        raise
+    except Exception as e:
+        print(f"Error during batched LLM comparison: {e}")
+        return {}
+
+    entries = result_json.get("comparisons", []) if isinstance(result_json, dict) else result_json
+    if not isinstance(entries, list):
+        return {}
+
+    results: Dict[int, ComparisonResult] = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        key = (str(entry.get("event_1_id")), str(entry.get("event_2_id")))
+        index = id_to_index.get(key)
+        if index is None or index in results:
+            continue
+        event1, event2 = pairs[index]
+        try:
+            result = ComparisonResult(
+                event_1_id=event1.event_id,
+                event_2_id=event2.event_id,
+                classification=entry.get("classification"),
+                explanation=entry.get("explanation") or "No explanation provided."
+            )
+        except Exception as e:
+            print(f"DEBUG: Malformed batch entry for {key}: {e}")
+            continue
+        comparison_cache.set(get_cache_key(event1, event2), result)
+        results[index] = result
+    return results
+
+
+async def compare_event_pairs(
+    pairs: List[Tuple[Event, Event]],
+    concurrency: int = COMPARISON_CONCURRENCY,
+    mode: str = COMPARISON_MODE,
+    on_result: Optional[Callable[[int, ComparisonResult], None]] = None,
+) -> List[ComparisonResult]:
+    """
+    Compares many event pairs concurrently, with at most `concurrency`
+    LLM calls in flight. Results are returned in the same order as `pairs`,
+    and a failure in one pair never affects the others, except that
+    LLMUnavailableError (quota exhausted, LLM down) aborts the whole run
+    rather than being reported as "consistent". If given, `on_result`
+    is called with (pair index, result) as soon as each pair is decided.
+
+    In "batch" mode, uncached pairs are packed into token-budgeted blocks and
+    classified one block per LLM call; any pair a batch response omits or
+    malforms is retried with a per-pair call.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    results: List[Optional[ComparisonResult]] = [None] * len(pairs)
+
+    def _record(index: int, result: ComparisonResult) -> None:
+        results[index] = result
+        if on_result is not None:
+            on_result(index, result)
+
+    async def _run(index: int, use_cache: bool = True) -> None:
+        event1, event2 = pairs[index]
+        async with semaphore:
+            try:
+                result = await compare_events(event1, event2, use_cache=use_cache)
+            except LLMUnavailableError:
+                raise
+            except Exception as e:
+                print(f"Error comparing {event1.event_id} vs {event2.event_id}: {e}")
+                result = ComparisonResult(
+                    event_1_id=event1.event_id,
+                    event_2_id=event2.event_id,
+                    classification="consistent",
+                    explanation="Skipped analysis due to comparison error; treating as consistent for stability."
+                )
+        _record(index, result)
+
+    if mode != "batch" or not GEMINI_API_KEY:
+        await gather_or_cancel(_run(index) for index in range(len(pairs)))
+        return results
+
+    for index, (event1, event2) in enumerate(pairs):
+        cached_result = _cached_comparison(event1, event2)
+        if cached_result is not None:
+            _record(index, cached_result)
+    pending = [index for index, result in enumerate(results) if result is None]
+
+    async def _run_batch(indices: List[int]) -> None:
+        async with semaphore:
+            batch_results = await compare_event_batch([pairs[index] for index in indices])
+        for position, result in batch_results.items():
+            _record(indices[position], result)
+
+    batches = _build_batches(pairs, pending)
+    await gather_or_cancel(_run_batch(batch) for batch in batches)
+
+    missing = [index for index, result in enumerate(results) if result is None]
+    print(f"DEBUG: Batched {len(pending)} pairs into {len(batches)} calls; {len(missing)} pairs fall back to per-pair calls")
+    # Cache was already consulted for these pairs above.
+    await gather_or_cancel(_run(index, use_cache=False) for index in missing)
+
+    return results
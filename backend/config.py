@@ -22,3 +22,102 @@ if not SARVAM_API_KEY:
 SARVAM_STT_URL = os.getenv("SARVAM_STT_URL", "https://api.sarvam.ai/speech-to-text")
 SARVAM_STT_MODEL = os.getenv("SARVAM_STT_MODEL", "sarvam-stt")
 
+# Global LLM scheduler (llm.LLMScheduler), shared by every analysis and job.
+# Budgets are per rolling minute; 0 disables a budget. Transient failures
+# (429/5xx/timeouts) are retried up to LLM_MAX_RETRIES times with jittered
+# exponential backoff; LLM_BREAKER_FAILURES consecutive failures open the
+# circuit and fail calls fast for LLM_BREAKER_COOLDOWN_SECONDS.
+LLM_RPM = int(os.getenv("LLM_RPM", "1000"))
+LLM_TPM = int(os.getenv("LLM_TPM", "1000000"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_CALL_TIMEOUT_SECONDS = float(os.getenv("LLM_CALL_TIMEOUT_SECONDS", "120"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "1"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "30"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "8"))
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+
+# Maximum number of event-pair comparisons dispatched to the LLM at once.
+COMPARISON_CONCURRENCY = int(os.getenv("COMPARISON_CONCURRENCY", "8"))
+
+# Comparison mode: "pair" sends one LLM call per event pair, "batch" packs
+# several pairs into one prompt (see compare.compare_event_pairs).
+COMPARISON_MODE = os.getenv("COMPARISON_MODE", "batch").lower()
+# Approximate token budget for the event pairs of a single batched prompt.
+COMPARISON_BATCH_TOKEN_BUDGET = int(os.getenv("COMPARISON_BATCH_TOKEN_BUDGET", "4000"))
+# Upper bound on pairs per batch, which also bounds the size of the JSON reply.
+COMPARISON_BATCH_MAX_PAIRS = int(os.getenv("COMPARISON_BATCH_MAX_PAIRS", "20"))
+
+# Local similarity pre-filter (filters.select_candidate_pairs): each event keeps
+# its top-k most similar counterparts plus any pair at or above the threshold.
+PREFILTER_ENABLED = os.getenv("PREFILTER_ENABLED", "true").lower() in ("1", "true", "yes")
+PREFILTER_TOP_K = int(os.getenv("PREFILTER_TOP_K", "3"))
+PREFILTER_SIMILARITY_THRESHOLD = float(os.getenv("PREFILTER_SIMILARITY_THRESHOLD", "0.35"))
+
+# How event pairs are chosen for LLM comparison: "align" pairs each event with
+# at most one counterpart (filters.align_events) and reports the rest as
+# omission candidates; "prefilter" keeps the top-k pre-filter above.
+PAIR_SELECTION = os.getenv("PAIR_SELECTION", "align").lower()
+# Lowest alignment score at which two events are still considered the same
+# fact; ALIGNMENT_ORDER_WEIGHT penalizes pairs far apart in narrative order.
+ALIGNMENT_MIN_SCORE = float(os.getenv("ALIGNMENT_MIN_SCORE", "0.15"))
+ALIGNMENT_ORDER_WEIGHT = float(os.getenv("ALIGNMENT_ORDER_WEIGHT", "0.1"))
+
+# Comparison result cache bounds (filters.comparison_cache).
+COMPARISON_CACHE_MAX_ENTRIES = int(os.getenv("COMPARISON_CACHE_MAX_ENTRIES", "5000"))
+COMPARISON_CACHE_MAX_BYTES = int(os.getenv("COMPARISON_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+COMPARISON_CACHE_TTL_SECONDS = float(os.getenv("COMPARISON_CACHE_TTL_SECONDS", str(24 * 3600)))
+
+# Long statements are split into sentence-aligned chunks of about
+# EXTRACTION_CHUNK_CHARS characters, consecutive chunks sharing
+# EXTRACTION_CHUNK_OVERLAP_SENTENCES sentences; at most
+# EXTRACTION_CONCURRENCY chunks are extracted at once.
+EXTRACTION_CHUNK_CHARS = int(os.getenv("EXTRACTION_CHUNK_CHARS", "2000"))
+EXTRACTION_CHUNK_OVERLAP_SENTENCES = int(os.getenv("EXTRACTION_CHUNK_OVERLAP_SENTENCES", "1"))
+EXTRACTION_CONCURRENCY = int(os.getenv("EXTRACTION_CONCURRENCY", "8"))
+
+# Extraction result cache bounds (extraction.extraction_cache).
+EXTRACTION_CACHE_MAX_ENTRIES = int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "500"))
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+EXTRACTION_CACHE_TTL_SECONDS = float(os.getenv("EXTRACTION_CACHE_TTL_SECONDS", str(24 * 3600)))
+
+# Background analysis jobs (jobs.JobManager): worker count, SQLite store path,
+# and the minimum interval between progress writes for one job.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(os.path.dirname(__file__), "jobs.db"))
+JOB_PROGRESS_INTERVAL_SECONDS = float(os.getenv("JOB_PROGRESS_INTERVAL_SECONDS", "1.0"))
+
+# Remote PaddleOCR page requests (ocr.py): max concurrent pages per OCR host,
+# per-page timeout in seconds and retries for transient failures.
+OCR_MAX_CONCURRENCY = int(os.getenv("OCR_MAX_CONCURRENCY", "4"))
+OCR_PAGE_TIMEOUT_SECONDS = float(os.getenv("OCR_PAGE_TIMEOUT_SECONDS", "30"))
+OCR_MAX_RETRIES = int(os.getenv("OCR_MAX_RETRIES", "2"))
+
+# PDF pages whose text layer has at least this many characters are used as
+# typed text; the other pages are sent to OCR.
+PDF_PAGE_MIN_TEXT_CHARS = int(os.getenv("PDF_PAGE_MIN_TEXT_CHARS", "50"))
+
+# Persistent OCR result cache (ocr.ocr_cache), keyed by file and page hashes.
+OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", os.path.join(os.path.dirname(__file__), "ocr_cache.db"))
+OCR_CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Image preprocessing before OCR (ocr._preprocess_for_ocr): grayscale, deskew and
+# border crop always apply when enabled; binarization and encoding are tunable.
+OCR_PREPROCESS = os.getenv("OCR_PREPROCESS", "true").lower() in ("1", "true", "yes")
+OCR_BINARIZE = os.getenv("OCR_BINARIZE", "true").lower() in ("1", "true", "yes")
+OCR_ENCODING = os.getenv("OCR_ENCODING", "png").lower()  # "png" or "jpeg"
+OCR_JPEG_QUALITY = int(os.getenv("OCR_JPEG_QUALITY", "85"))
+
+# Upload handling (uploads.py): request bodies above MAX_UPLOAD_BYTES are
+# rejected with 413; uploads above UPLOAD_SPOOL_BYTES are memory-mapped from
+# disk rather than read into memory.
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(1024 * 1024)))
+
+# Long recordings (stt.py) are split on silences into segments of about
+# STT_SEGMENT_SECONDS, padded by STT_SEGMENT_OVERLAP_SECONDS, and transcribed
+# with at most STT_MAX_CONCURRENCY requests in flight.
+STT_SEGMENT_SECONDS = float(os.getenv("STT_SEGMENT_SECONDS", "25"))
+STT_SEGMENT_OVERLAP_SECONDS = float(os.getenv("STT_SEGMENT_OVERLAP_SECONDS", "1"))
+STT_MAX_CONCURRENCY = int(os.getenv("STT_MAX_CONCURRENCY", "4"))
+STT_TIMEOUT_SECONDS = float(os.getenv("STT_TIMEOUT_SECONDS", "60"))
@@ -1,41 +1,67 @@
+import asyncio
+import difflib
+import hashlib
 import json
-import google.generativeai as genai
+import re
+from typing import List, Optional, Tuple
 from schemas import ExtractedEvents, Event
-from prompts import EXTRACTION_PROMPT
-from config import GEMINI_API_KEY, GEMINI_MODEL_NAME
+from prompts import EXTRACTION_PROMPT, EXTRACTION_PROMPT_VERSION
+from config import (
+    GEMINI_API_KEY,
+    GEMINI_MODEL_NAME,
+    EXTRACTION_CACHE_MAX_ENTRIES,
+    EXTRACTION_CACHE_MAX_BYTES,
+    EXTRACTION_CACHE_TTL_SECONDS,
+    EXTRACTION_CHUNK_CHARS,
+    EXTRACTION_CHUNK_OVERLAP_SENTENCES,
+    EXTRACTION_CONCURRENCY,
+)
+from ingestion import clean_text, chunk_text, split_sentences
+from llm import generate_text, clean_json_response, gather_or_cancel, LLMUnavailableError
+from cache import LRUCache
 
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+# Content-addressed cache of extraction results, so re-analysing an unchanged
+# statement costs no LLM call. Entries are per chunk, plus one per whole
+# statement that incremental re-analysis diffs against.
+extraction_cache = LRUCache(
+    "extraction",
+    max_entries=EXTRACTION_CACHE_MAX_ENTRIES,
+    max_bytes=EXTRACTION_CACHE_MAX_BYTES,
+    ttl_seconds=EXTRACTION_CACHE_TTL_SECONDS,
+    size_of=lambda events: sum(len(e.model_dump_json()) for e in events),
+)
 
-async def extract_events_from_text(text: str, statement_type: str) -> list[Event]:
+class ExtractionError(Exception):
+    """Events could not be extracted, so a statement's events are unknown rather than none."""
+
+
+def get_extraction_cache_key(text: str, statement_type: str, scope: str = "chunk") -> str:
+    payload = [GEMINI_MODEL_NAME, EXTRACTION_PROMPT_VERSION, scope, statement_type, clean_text(text)]
+    raw = json.dumps(payload, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+async def extract_events_from_chunk(text: str, statement_type: str) -> Optional[list[Event]]:
     """
-    Uses Gemini API to extract structured events.
+    Uses Gemini API to extract structured events from one chunk of a statement.
+    Returns None if the LLM call or its JSON failed; LLMUnavailableError
+    propagates so a rate-limited run fails instead of losing events.
     """
-    if not GEMINI_API_KEY:
-        print("Error: GEMINI_API_KEY not set.")
-        return []
+    cache_key = get_extraction_cache_key(text, statement_type)
+    cached_events = extraction_cache.get(cache_key)
+    if cached_events is not None:
+        print(f"DEBUG: Extraction cache hit for {statement_type} ({len(cached_events)} events)")
+        return [e.model_copy() for e in cached_events]
 
-    model = genai.GenerativeModel(GEMINI_MODEL_NAME)
-    
     prompt = EXTRACTION_PROMPT.format(statement_type=statement_type, text=text)
 
     print(f"DEBUG: Extracting from text (len={len(text)}): {text[:50]}...")
+    raw_text = None
     try:
-        response = model.generate_content(
-            prompt,
-            generation_config={"response_mime_type": "application/json"}
-        )
-        print(f"DEBUG: LLM Raw Response: {response.text}")
+        raw_text = await generate_text(prompt, json_mode=True)
+        print(f"DEBUG: LLM Raw Response: {raw_text}")
         
         # Clean the response - sometimes LLM adds markdown or extra text
-        response_text = response.text.strip()
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]  # Remove ```json
-        if response_text.startswith("```"):
-            response_text = response_text[3:]  # Remove ```
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]  # Remove trailing ```
-        response_text = response_text.strip()
+        response_text = clean_json_response(raw_text)
         
         result_json = json.loads(response_text)
         events_data = result_json.get("events", [])
@@ -44,7 +70,7 @@ async def extract_events_from_text(text: str, statement_type: str) -> list[Event
         events: list[Event] = []
         for e in events_data:
             events.append(Event(
-                event_id=f"{statement_type}_{len(events)+1}",  # Simple ID generation
+                event_id="",  # Content-derived ID assigned when merging chunks
                 actor=e.get("actor", "Unknown"),
                 action=e.get("action", "Unknown"),
                 target=e.get("target"),
@@ -54,30 +80,305 @@ async def extract_events_from_text(text: str, statement_type: str) -> list[Event
                 statement_type=statement_type,  # Force the type
             ))
 
-        # Fallback: if the LLM did not extract any events but the text
-        # is non-empty, create a single generic event covering the whole
-        # statement so that downstream comparison can still operate.
-        if not events and text and text.strip():
-            print("DEBUG: No events extracted; creating fallback event from full text.")
-            events.append(Event(
-                event_id=f"{statement_type}_1_fallback",
-                actor="Witness",
-                action=text.strip(),
-                target=None,
-                time=None,
-                location=None,
-                source_sentence=text.strip(),
-                statement_type=statement_type,
-            ))
-
+        extraction_cache.set(cache_key, [e.model_copy() for e in events])
         return events
 
+    except LLMUnavailableError:
+        raise
     except json.JSONDecodeError as je:
         print(f"JSON Decode Error during LLM extraction: {je}")
-        print(f"Response was: {response.text if 'response' in locals() else 'No response'}")
-        return []
+        print(f"Response was: {raw_text if raw_text is not None else 'No response'}")
+        return None
     except Exception as e:
         print(f"Error during LLM extraction: {e}")
         import traceback
         traceback.print_exc()
-        return []
+        return None
+
+
+def _dedup_key(event: Event) -> tuple:
+    """
+    Events extracted twice from the sentences shared by neighbouring chunks
+    agree on every field once case, spacing and punctuation are ignored.
+    Distinct events from one sentence (two actors, say) keep distinct keys.
+    """
+    def norm(value: Optional[str]) -> str:
+        return re.sub(r"[^\w]+", " ", (value or "").lower()).strip()
+
+    return (
+        norm(event.source_sentence),
+        norm(event.actor),
+        norm(event.action),
+        norm(event.target),
+        norm(event.time),
+        norm(event.location),
+    )
+
+
+# Hex digits of the content hash used in event IDs; extended on collision.
+EVENT_ID_DIGEST_CHARS = 12
+
+def _event_content_digest(event: Event) -> str:
+    def norm(value: Optional[str]) -> str:
+        return re.sub(r"\s+", " ", (value or "").lower()).strip()
+
+    payload = [
+        event.statement_type,
+        norm(event.actor),
+        norm(event.action),
+        norm(event.target),
+        norm(event.time),
+        norm(event.location),
+        norm(event.source_sentence),
+    ]
+    raw = json.dumps(payload, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def assign_event_ids(events: list[Event], statement_type: str) -> list[Event]:
+    """
+    Gives each event an ID derived from its normalized content and source
+    sentence, {statement_type}_{hash prefix}, so the same fact extracted in
+    another request or worker gets the same ID regardless of extraction
+    order. Two different events sharing a prefix get longer prefixes;
+    identical events within one list are suffixed _2, _3, ...
+    """
+    digests = [_event_content_digest(e) for e in events]
+    distinct = sorted(set(digests))
+    length = EVENT_ID_DIGEST_CHARS
+    while len({d[:length] for d in distinct}) < len(distinct):
+        length += 4
+
+    used = {}
+    result = []
+    for event, digest in zip(events, digests):
+        event_id = f"{statement_type}_{digest[:length]}"
+        used[event_id] = used.get(event_id, 0) + 1
+        if used[event_id] > 1:
+            event_id = f"{event_id}_{used[event_id]}"
+        result.append(event.model_copy(update={"event_id": event_id}))
+    return result
+
+
+def merge_chunk_events(chunk_events: List[list[Event]], statement_type: str) -> list[Event]:
+    """
+    Merges per-chunk event lists in document order and assigns
+    content-derived IDs to the result. An event is dropped only when the
+    previous chunk already produced it, i.e. it came from their overlap;
+    events within one chunk are never merged with each other.
+    """
+    merged: list[Event] = []
+    previous_keys: set = set()
+    for events in chunk_events:
+        keys = set()
+        for event in events:
+            key = _dedup_key(event)
+            keys.add(key)
+            if key in previous_keys:
+                continue
+            merged.append(event)
+        previous_keys = keys
+    return assign_event_ids(merged, statement_type)
+
+
+async def extract_events_from_text(
+    text: str,
+    statement_type: str,
+    semaphore: Optional[asyncio.Semaphore] = None,
+) -> list[Event]:
+    """
+    Extracts events from a statement. Long statements are split into
+    overlapping sentence-aligned chunks that are extracted concurrently, so
+    latency follows the longest chunk rather than the whole document.
+    Raises ExtractionError if any chunk fails: a statement missing events
+    would make everything the other statement says look like an omission.
+    """
+    if not GEMINI_API_KEY:
+        raise ExtractionError("GEMINI_API_KEY not set")
+
+    statement_key = get_extraction_cache_key(text, statement_type, scope="statement")
+    cached_events = extraction_cache.get(statement_key)
+    if cached_events is not None:
+        return [e.model_copy() for e in cached_events]
+
+    chunks = chunk_text(text, EXTRACTION_CHUNK_CHARS, EXTRACTION_CHUNK_OVERLAP_SENTENCES)
+    if len(chunks) > 1:
+        print(f"DEBUG: Split {statement_type} statement (len={len(text)}) into {len(chunks)} chunks")
+
+    semaphore = semaphore or asyncio.Semaphore(EXTRACTION_CONCURRENCY)
+
+    async def _extract(chunk: str) -> Optional[list[Event]]:
+        async with semaphore:
+            return await extract_events_from_chunk(chunk, statement_type)
+
+    results = await gather_or_cancel(_extract(chunk) for chunk in chunks)
+    failed = sum(r is None for r in results)
+    if failed:
+        raise ExtractionError(f"event extraction failed for {failed}/{len(chunks)} parts of the {statement_type} statement")
+
+    events = merge_chunk_events(results, statement_type)
+
+    # Fallback: if the LLM did not extract any events but the text
+    # is non-empty, create a single generic event covering the whole
+    # statement so that downstream comparison can still operate.
+    if not events and text and text.strip():
+        events = assign_event_ids([_fallback_event(text, statement_type)], statement_type)
+
+    extraction_cache.set(statement_key, [e.model_copy() for e in events])
+    return events
+
+
+def _fallback_event(text: str, statement_type: str) -> Event:
+    print("DEBUG: No events extracted; creating fallback event from full text.")
+    return Event(
+        event_id="",
+        actor="Witness",
+        action=text.strip(),
+        target=None,
+        time=None,
+        location=None,
+        source_sentence=text.strip(),
+        statement_type=statement_type,
+    )
+
+
+def _normalize_sentence(text: str) -> str:
+    return re.sub(r"[^\w]+", " ", text.lower()).strip()
+
+
+def _locate_sentences(events: list[Event], sentences: List[str]) -> List[Optional[int]]:
+    """
+    Index of the sentence each event was extracted from, or None. An event
+    belongs to the sentence that contains its source_sentence, else to the
+    one sharing at least half of their combined words.
+    """
+    normalized = [_normalize_sentence(s) for s in sentences]
+    word_sets = [set(s.split()) for s in normalized]
+    located = []
+    for event in events:
+        source = _normalize_sentence(event.source_sentence or "")
+        index = None
+        if source:
+            index = next(
+                (i for i, s in enumerate(normalized) if source in s),
+                None,
+            )
+            if index is None:
+                words = set(source.split())
+                best = max(
+                    range(len(sentences)),
+                    key=lambda i: len(words & word_sets[i]) / len(words | word_sets[i]),
+                    default=None,
+                )
+                if best is not None and len(words & word_sets[best]) / len(words | word_sets[best]) >= 0.5:
+                    index = best
+        located.append(index)
+    return located
+
+
+async def extract_events_incremental(
+    text: str,
+    previous_text: str,
+    statement_type: str,
+    semaphore: Optional[asyncio.Semaphore] = None,
+) -> list[Event]:
+    """
+    Re-extracts a statement after the user edited `previous_text` into `text`.
+
+    The two versions are diffed sentence by sentence. Events of unchanged
+    sentences are reused from the previous extraction (so their comparisons
+    stay cached), and only the changed sentences, with one sentence of
+    context either side, are sent to the LLM. Falls back to a full
+    extraction when the previous version is no longer cached or its events
+    cannot be mapped back to sentences.
+    """
+    if not GEMINI_API_KEY:
+        raise ExtractionError("GEMINI_API_KEY not set")
+
+    previous_events = extraction_cache.get(
+        get_extraction_cache_key(previous_text, statement_type, scope="statement")
+    )
+    old_sentences = split_sentences(clean_text(previous_text))
+    new_sentences = split_sentences(clean_text(text))
+    old_located = _locate_sentences(previous_events or [], old_sentences)
+    if previous_events is None or any(i is None for i in old_located):
+        print(f"DEBUG: Incremental extraction unavailable for {statement_type}; extracting in full")
+        return await extract_events_from_text(text, statement_type, semaphore)
+
+    matcher = difflib.SequenceMatcher(a=old_sentences, b=new_sentences, autojunk=False)
+    old_to_new = {}
+    changed_regions = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            old_to_new.update({i1 + k: j1 + k for k in range(i2 - i1)})
+        elif j2 > j1:
+            changed_regions.append((j1, j2))
+
+    # (new sentence index, order, event) for every event of the new version
+    placed = [
+        (old_to_new[i], n, event)
+        for n, (i, event) in enumerate(zip(old_located, previous_events))
+        if i in old_to_new
+    ]
+    print(f"DEBUG: Incremental {statement_type}: reusing {len(placed)}/{len(previous_events)} events, "
+          f"re-extracting {sum(j2 - j1 for j1, j2 in changed_regions)}/{len(new_sentences)} sentences")
+
+    semaphore = semaphore or asyncio.Semaphore(EXTRACTION_CONCURRENCY)
+
+    async def _extract_region(j1: int, j2: int) -> Optional[list]:
+        lo, hi = max(j1 - 1, 0), min(j2 + 1, len(new_sentences))
+        context = new_sentences[lo:hi]
+        chunks = chunk_text(" ".join(context), EXTRACTION_CHUNK_CHARS, EXTRACTION_CHUNK_OVERLAP_SENTENCES)
+        async with semaphore:
+            results = [await extract_events_from_chunk(chunk, statement_type) for chunk in chunks]
+        if any(r is None for r in results):
+            return None
+        events = merge_chunk_events(results, statement_type)
+        region = []
+        for n, (i, event) in enumerate(zip(_locate_sentences(events, context), events)):
+            index = j1 if i is None else lo + i
+            # Events of the context sentences are already kept from before.
+            if j1 <= index < j2:
+                region.append((index, len(previous_events) + n, event))
+        return region
+
+    regions = await gather_or_cancel(_extract_region(j1, j2) for j1, j2 in changed_regions)
+    if any(r is None for r in regions):
+        return await extract_events_from_text(text, statement_type, semaphore)
+    for region in regions:
+        placed.extend(region)
+
+    placed.sort(key=lambda item: (item[0], item[1]))
+    events = merge_chunk_events([[event for _, _, event in placed]], statement_type)
+    if not events and text and text.strip():
+        events = assign_event_ids([_fallback_event(text, statement_type)], statement_type)
+
+    extraction_cache.set(
+        get_extraction_cache_key(text, statement_type, scope="statement"),
+        [e.model_copy() for e in events],
+    )
+    return events
+
+
+async def extract_events_from_statements(
+    statements: List[Tuple[str, str]],
+    previous_texts: Optional[List[Optional[str]]] = None,
+) -> List[list[Event]]:
+    """
+    Extracts events from several (text, statement_type) statements concurrently,
+    sharing one EXTRACTION_CONCURRENCY limit across all of their chunks.
+    Statements with a previous version in `previous_texts` are re-extracted
+    incrementally. Returns one event list per statement, in the order given.
+    """
+    semaphore = asyncio.Semaphore(EXTRACTION_CONCURRENCY)
+    previous_texts = previous_texts or [None] * len(statements)
+
+    def _extract(text: str, statement_type: str, previous_text: Optional[str]):
+        if previous_text is not None and previous_text != text:
+            return extract_events_incremental(text, previous_text, statement_type, semaphore)
+        return extract_events_from_text(text, statement_type, semaphore)
+
+    return await gather_or_cancel(
+        _extract(text, statement_type, previous_text)
+        for (text, statement_type), previous_text in zip(statements, previous_texts)
+    )
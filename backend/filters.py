@@ -1,26 +1,91 @@
-from typing import List, Dict, Any
+import hashlib
+import json
+import zlib
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+
 from schemas import Event, ReportRow, ComparisonResult
+from config import (
+    GEMINI_MODEL_NAME,
+    PREFILTER_ENABLED,
+    PREFILTER_TOP_K,
+    PREFILTER_SIMILARITY_THRESHOLD,
+    ALIGNMENT_MIN_SCORE,
+    ALIGNMENT_ORDER_WEIGHT,
+    COMPARISON_CACHE_MAX_ENTRIES,
+    COMPARISON_CACHE_MAX_BYTES,
+    COMPARISON_CACHE_TTL_SECONDS,
+)
+from prompts import COMPARISON_PROMPT_VERSION
+from cache import LRUCache
+from keywords import KeywordMatcher
 
 # --- RULE A: ACTION COMPATIBILITY ---
+# Extraction output is in the statement's language, so each category lists
+# keywords per language. Categories are checked in this order.
 ACTION_CATEGORIES = {
-    "presence": ["was present", "was inside", "standing", "present", "arrived", "sitting", "seen at", "at the spot"],
-    "movement": ["came out", "went", "walking", "running", "fled", "escaped", "entered", "left", "moving"],
-    "absence": ["was not present", "not there", "absent", "left before", "nowhere", "did not see", "not seen"],
-    "violence": ["assaulted", "hit", "stabbed", "beat", "attacked", "slapped", "kicked", "shot", "fired"],
-    "weapon": ["held knife", "used stick", "armed", "carrying", "brandished", "took out"],
-    "aftermath": ["was bleeding", "was lying", "fell down", "unconscious", "died"]
+    "presence": {
+        "en": ["was present", "was inside", "standing", "present", "arrived", "sitting", "seen at", "at the spot"],
+        "hi": ["मौजूद", "उपस्थित", "खड़ा था", "खड़ी थी", "बैठा था", "बैठी थी", "मौके पर", "पहुंचा", "पहुँचा"],
+        "ml": ["ഹാജരായിരുന്നു", "നിൽക്കുകയായിരുന്നു", "ഇരിക്കുകയായിരുന്നു", "സംഭവസ്ഥലത്ത്", "എത്തി"],
+        "ta": ["இருந்தார்", "இருந்தான்", "நின்றுகொண்டிருந்த", "உட்கார்ந்திருந்த", "சம்பவ இடத்தில்", "வந்தடைந்த"],
+        "te": ["ఉన్నాడు", "ఉన్నారు", "నిలబడి ఉన్న", "కూర్చుని ఉన్న", "సంఘటన స్థలంలో", "చేరుకున్న"],
+        "kn": ["ಹಾಜರಿದ್ದ", "ನಿಂತಿದ್ದ", "ಕುಳಿತಿದ್ದ", "ಸ್ಥಳದಲ್ಲಿದ್ದ", "ಬಂದು ತಲುಪಿದ"],
+        "bn": ["উপস্থিত", "দাঁড়িয়ে ছিল", "বসে ছিল", "ঘটনাস্থলে", "পৌঁছায়"],
+    },
+    "movement": {
+        "en": ["came out", "went", "walking", "running", "fled", "escaped", "entered", "left", "moving"],
+        "hi": ["भाग गया", "भागा", "फरार", "घुसा", "अंदर गया", "बाहर निकला", "दौड़", "चलकर"],
+        "ml": ["ഓടി", "രക്ഷപ്പെട്ടു", "കടന്നു", "പുറത്തിറങ്ങി", "നടന്നു", "പോയി"],
+        "ta": ["ஓடி", "தப்பி", "நுழைந்த", "வெளியே வந்த", "நடந்து", "சென்றா"],
+        "te": ["పారిపో", "పరుగెత్త", "ప్రవేశించ", "బయటకు వచ్చ", "నడుచుకుంటూ", "వెళ్ళి"],
+        "kn": ["ಓಡಿ", "ತಪ್ಪಿಸಿಕೊಂಡ", "ಪ್ರವೇಶಿಸಿದ", "ಹೊರಗೆ ಬಂದ", "ನಡೆದು", "ಹೋದ"],
+        "bn": ["পালিয়ে", "দৌড়ে", "ঢুকে", "বেরিয়ে", "হেঁটে", "চলে গেল"],
+    },
+    "absence": {
+        "en": ["was not present", "not there", "absent", "left before", "nowhere", "did not see", "not seen"],
+        "hi": ["मौजूद नहीं", "उपस्थित नहीं", "अनुपस्थित", "नहीं देखा", "पहले ही चला गया"],
+        "ml": ["ഉണ്ടായിരുന്നില്ല", "ഹാജരായിരുന്നില്ല", "കണ്ടില്ല", "ഇല്ലായിരുന്നു"],
+        "ta": ["இல்லை", "இருக்கவில்லை", "பார்க்கவில்லை", "காணவில்லை"],
+        "te": ["లేడు", "లేరు", "చూడలేదు", "కనిపించలేదు"],
+        "kn": ["ಇರಲಿಲ್ಲ", "ನೋಡಲಿಲ್ಲ", "ಕಾಣಲಿಲ್ಲ", "ಗೈರುಹಾಜರ"],
+        "bn": ["উপস্থিত ছিল না", "অনুপস্থিত", "দেখিনি", "দেখা যায়নি"],
+    },
+    "violence": {
+        "en": ["assaulted", "hit", "stabbed", "beat", "attacked", "slapped", "kicked", "shot", "fired"],
+        "hi": ["मारा", "पीटा", "हमला", "चाकू घोंपा", "थप्पड़", "लात", "गोली चलाई", "गोली मारी"],
+        "ml": ["അടിച്ചു", "കുത്തി", "ആക്രമിച്ചു", "മർദ്ദിച്ചു", "ചവിട്ടി", "വെടിവച്ചു"],
+        "ta": ["அடித்த", "குத்திய", "தாக்கிய", "உதைத்த", "சுட்ட"],
+        "te": ["కొట్టా", "పొడిచా", "దాడి", "తన్నా", "కాల్చా"],
+        "kn": ["ಹೊಡೆದ", "ಇರಿದ", "ಹಲ್ಲೆ", "ಒದೆದ", "ಗುಂಡು ಹಾರಿಸಿದ"],
+        "bn": ["মারধর", "আঘাত", "ছুরি মারে", "হামলা", "লাথি", "গুলি করে"],
+    },
+    "weapon": {
+        "en": ["held knife", "used stick", "armed", "carrying", "brandished", "took out"],
+        "hi": ["चाकू लिए", "लाठी", "हथियार", "बंदूक", "निकाला"],
+        "ml": ["കത്തിയുമായി", "വടി", "ആയുധം", "തോക്ക്"],
+        "ta": ["கத்தியுடன்", "தடி", "ஆயுதம்", "துப்பாக்கி"],
+        "te": ["కత్తితో", "కర్ర", "ఆయుధం", "తుపాకీ"],
+        "kn": ["ಚಾಕು ಹಿಡಿದು", "ದೊಣ್ಣೆ", "ಆಯುಧ", "ಬಂದೂಕು"],
+        "bn": ["ছুরি হাতে", "লাঠি", "অস্ত্র", "বন্দুক"],
+    },
+    "aftermath": {
+        "en": ["was bleeding", "was lying", "fell down", "unconscious", "died"],
+        "hi": ["खून बह", "पड़ा हुआ", "गिर गया", "बेहोश", "मौत", "मर गया"],
+        "ml": ["രക്തം വാർന്ന", "കിടക്കുകയായിരുന്നു", "വീണു", "ബോധരഹിത", "മരിച്ചു"],
+        "ta": ["இரத்தம் வழிந்த", "கிடந்த", "விழுந்த", "மயங்கி", "இறந்த"],
+        "te": ["రక్తం కారు", "పడి ఉన్న", "కింద పడ్డ", "స్పృహ తప్ప", "మరణించ"],
+        "kn": ["ರಕ್ತ ಸೋರ", "ಬಿದ್ದಿದ್ದ", "ಕೆಳಗೆ ಬಿದ್ದ", "ಪ್ರಜ್ಞಾಹೀನ", "ಮೃತಪಟ್ಟ"],
+        "bn": ["রক্ত ঝরছিল", "পড়ে ছিল", "পড়ে যায়", "অজ্ঞান", "মারা যায়"],
+    },
 }
 
+ACTION_MATCHER = KeywordMatcher(ACTION_CATEGORIES)
+
 def get_action_category(action_text: str) -> str:
     """Classifies an action string into a category or returns 'other'."""
-    if not action_text:
-        return "other"
-    
-    act = action_text.lower()
-    for cat, keywords in ACTION_CATEGORIES.items():
-        if any(k in act for k in keywords):
-            return cat
-    return "other"
+    return ACTION_MATCHER.first(action_text, default="other")
 
 def are_actions_compatible(action1: str, action2: str) -> bool:
     """
@@ -71,6 +136,154 @@ def should_compare_events(e1: Event, e2: Event) -> bool:
     
     return True
 
+# --- RULE D: LOCAL SIMILARITY PRE-FILTER ---
+# Character n-grams are script-agnostic, so the same vectorizer works for
+# Malayalam, Hindi, Tamil etc. without tokenizers or language models.
+NGRAM_SIZE = 3
+VECTOR_DIM = 4096
+EVENT_FIELDS = ("actor", "action", "target", "location")
+
+def _event_ngrams(event: Event) -> List[str]:
+    ngrams = []
+    for field in EVENT_FIELDS:
+        value = getattr(event, field) or ""
+        value = " ".join(value.lower().split())
+        if not value:
+            continue
+        padded = f" {value} "
+        if len(padded) <= NGRAM_SIZE:
+            ngrams.append(padded)
+            continue
+        ngrams.extend(padded[k:k + NGRAM_SIZE] for k in range(len(padded) - NGRAM_SIZE + 1))
+    return ngrams
+
+def vectorize_events(events: List[Event]) -> np.ndarray:
+    """
+    Hashes each event's character n-grams into a fixed-size, L2-normalised
+    row vector. Returns an (len(events), VECTOR_DIM) float32 matrix.
+    """
+    matrix = np.zeros((len(events), VECTOR_DIM), dtype=np.float32)
+    for row, event in enumerate(events):
+        ngrams = _event_ngrams(event)
+        if not ngrams:
+            continue
+        # crc32 rather than hash() so buckets are stable across processes.
+        buckets = np.fromiter(
+            (zlib.crc32(g.encode("utf-8")) % VECTOR_DIM for g in ngrams),
+            dtype=np.int64,
+            count=len(ngrams),
+        )
+        np.add.at(matrix[row], buckets, 1.0)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+def select_candidate_pairs(
+    events1: List[Event],
+    events2: List[Event],
+    top_k: int = PREFILTER_TOP_K,
+    threshold: float = PREFILTER_SIMILARITY_THRESHOLD,
+) -> Tuple[List[Tuple[Event, Event]], Dict[str, Any]]:
+    """
+    Computes the full similarity matrix between both event lists in one shot
+    and keeps, for every event on either side, its top-k most similar
+    counterparts plus any pair scoring at or above `threshold`. Surviving
+    pairs still have to pass should_compare_events.
+
+    Returns the candidate pairs in (i, j) order and pruning statistics.
+    """
+    total = len(events1) * len(events2)
+    if total == 0:
+        return [], {"total_pairs": 0, "candidate_pairs": 0, "pruned_pairs": 0, "pruning_ratio": 0.0}
+
+    if PREFILTER_ENABLED:
+        similarity = vectorize_events(events1) @ vectorize_events(events2).T
+        keep = similarity >= threshold
+        k_row = min(top_k, similarity.shape[1])
+        k_col = min(top_k, similarity.shape[0])
+        if k_row > 0:
+            top_cols = np.argpartition(-similarity, k_row - 1, axis=1)[:, :k_row]
+            np.put_along_axis(keep, top_cols, True, axis=1)
+        if k_col > 0:
+            top_rows = np.argpartition(-similarity, k_col - 1, axis=0)[:k_col, :]
+            np.put_along_axis(keep, top_rows, True, axis=0)
+    else:
+        keep = np.ones((len(events1), len(events2)), dtype=bool)
+
+    pairs = []
+    for i, j in zip(*np.nonzero(keep)):
+        e1, e2 = events1[i], events2[j]
+        if should_compare_events(e1, e2):
+            pairs.append((e1, e2))
+
+    pruned = total - len(pairs)
+    stats = {
+        "total_pairs": total,
+        "candidate_pairs": len(pairs),
+        "pruned_pairs": pruned,
+        "pruning_ratio": round(pruned / total, 3),
+    }
+    return pairs, stats
+
+# --- RULE E: ONE-TO-ONE ALIGNMENT ---
+def align_events(
+    events1: List[Event],
+    events2: List[Event],
+    min_score: float = ALIGNMENT_MIN_SCORE,
+    order_weight: float = ALIGNMENT_ORDER_WEIGHT,
+) -> Tuple[List[Tuple[Event, Event]], List[Event], List[Event], Dict[str, Any]]:
+    """
+    Pairs each event with at most one event of the other statement.
+
+    The score matrix is the n-gram cosine similarity minus `order_weight`
+    times the distance between the events' relative positions (statements
+    usually narrate in the same order); pairs failing should_compare_events
+    are excluded. Pairs are then taken greedily from the highest score down,
+    skipping events already matched, until scores drop below `min_score`.
+
+    Returns the aligned pairs in statement-1 order, the unaligned events of
+    each statement (omission candidates) and alignment statistics.
+    """
+    total = len(events1) * len(events2)
+    pairs: List[Tuple[Event, Event]] = []
+    matched1 = np.zeros(len(events1), dtype=bool)
+    matched2 = np.zeros(len(events2), dtype=bool)
+
+    if total:
+        similarity = vectorize_events(events1) @ vectorize_events(events2).T
+        pos1 = (np.arange(len(events1)) + 0.5) / len(events1)
+        pos2 = (np.arange(len(events2)) + 0.5) / len(events2)
+        score = similarity - order_weight * np.abs(pos1[:, None] - pos2[None, :])
+        allowed = np.array(
+            [[should_compare_events(e1, e2) for e2 in events2] for e1 in events1], dtype=bool
+        )
+        score[~allowed] = -np.inf
+
+        flat_order = np.argsort(-score, axis=None, kind="stable")
+        rows, cols = np.unravel_index(flat_order, score.shape)
+        aligned = []
+        for i, j in zip(rows, cols):
+            if score[i, j] < min_score or len(aligned) == min(len(events1), len(events2)):
+                break
+            if matched1[i] or matched2[j]:
+                continue
+            matched1[i] = matched2[j] = True
+            aligned.append((i, j))
+        pairs = [(events1[i], events2[j]) for i, j in sorted(aligned)]
+
+    unaligned1 = [e for e, m in zip(events1, matched1) if not m]
+    unaligned2 = [e for e, m in zip(events2, matched2) if not m]
+    pruned = total - len(pairs)
+    stats = {
+        "total_pairs": total,
+        "candidate_pairs": len(pairs),
+        "pruned_pairs": pruned,
+        "pruning_ratio": round(pruned / total, 3) if total else 0.0,
+        "unaligned_1": len(unaligned1),
+        "unaligned_2": len(unaligned2),
+    }
+    return pairs, unaligned1, unaligned2, stats
+
 # --- OBJECTIVE 2: GROUPING ---
 def group_omissions(rows: List[ReportRow]) -> List[ReportRow]:
     """
@@ -134,9 +347,29 @@ def group_omissions(rows: List[ReportRow]) -> List[ReportRow]:
     return rows
 
 # --- CACHING ---
-# Simple dictionary cache
-comparison_cache: Dict[str, ComparisonResult] = {}
+# Bounded LRU/TTL cache of comparison verdicts, keyed by pair content.
+comparison_cache = LRUCache(
+    "comparison",
+    max_entries=COMPARISON_CACHE_MAX_ENTRIES,
+    max_bytes=COMPARISON_CACHE_MAX_BYTES,
+    ttl_seconds=COMPARISON_CACHE_TTL_SECONDS,
+    size_of=lambda result: len(result.model_dump_json()),
+)
+
+# Every Event field that is fed into COMPARISON_PROMPT.
+COMPARISON_KEY_FIELDS = ("statement_type", "actor", "action", "target", "time", "location")
 
 def get_cache_key(e1: Event, e2: Event) -> str:
-    return f"{e1.actor}:{e1.action}|{e2.actor}:{e2.action}".lower()
+    """
+    Hashes every prompt input of both events together with the model name and
+    prompt version, so pairs only share a verdict if the LLM saw the same thing.
+    """
+    payload = [
+        GEMINI_MODEL_NAME,
+        COMPARISON_PROMPT_VERSION,
+        [getattr(e1, f) for f in COMPARISON_KEY_FIELDS],
+        [getattr(e2, f) for f in COMPARISON_KEY_FIELDS],
+    ]
+    raw = json.dumps(payload, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
 
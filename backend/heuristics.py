@@ -1,4 +1,53 @@
 from schemas import ComparisonResult, ReportRow, Event
+from keywords import KeywordMatcher
+
+# Topics of an LLM explanation that decide contradiction severity. The LLM
+# explains in the statement's language, so keywords are listed per language.
+EXPLANATION_TOPICS = {
+    "identity": {
+        "en": ["identity", "presence", "role"],
+        "hi": ["पहचान", "उपस्थिति", "मौजूदगी", "भूमिका"],
+        "ml": ["തിരിച്ചറിയൽ", "സാന്നിധ്യം", "പങ്ക്"],
+        "ta": ["அடையாளம்", "இருப்பு", "பங்கு"],
+        "te": ["గుర్తింపు", "ఉనికి", "పాత్ర"],
+        "kn": ["ಗುರುತು", "ಉಪಸ್ಥಿತಿ", "ಪಾತ್ರ"],
+        "bn": ["পরিচয়", "উপস্থিতি", "ভূমিকা"],
+    },
+    "weapon": {
+        "en": ["weapon", "gun", "knife"],
+        "hi": ["हथियार", "बंदूक", "चाकू"],
+        "ml": ["ആയുധ", "തോക്ക്", "കത്തി"],
+        "ta": ["ஆயுத", "துப்பாக்கி", "கத்தியால்", "கத்தியை", "கத்தியுடன்"],
+        "te": ["ఆయుధ", "తుపాకీ", "కత్తి"],
+        "kn": ["ಆಯುಧ", "ಬಂದೂಕು", "ಚಾಕು"],
+        "bn": ["অস্ত্র", "বন্দুক", "ছুরি"],
+    },
+    "time": {
+        "en": ["time"],
+        "hi": ["समय"],
+        "ml": ["സമയ"],
+        "ta": ["நேர"],
+        "te": ["సమయ"],
+        "kn": ["ಸಮಯ"],
+        "bn": ["সময়"],
+    },
+    "minor": {
+        "en": ["minor"],
+        "hi": ["मामूली"],
+        "ml": ["നിസ്സാര"],
+        "ta": ["சிறிய"],
+        "te": ["చిన్న"],
+        "kn": ["ಸಣ್ಣ"],
+        "bn": ["সামান্য"],
+    },
+}
+
+EXPLANATION_MATCHER = KeywordMatcher(EXPLANATION_TOPICS)
+
+def _omission_severity(type1: str, type2: str) -> tuple[str, str]:
+    if type1 == "FIR" or type2 == "FIR":
+        return "Minor", "The FIR is not substantive evidence. It may be used only to corroborate or contradict its maker, and omissions must be assessed cautiously in light of surrounding circumstances."
+    return "Material", "Omission of material facts in sworn testimony may amount to a contradiction."
 
 def apply_legal_heuristics(comparison: ComparisonResult, event1: Event, event2: Event) -> ReportRow:
     """
@@ -11,27 +60,22 @@ def apply_legal_heuristics(comparison: ComparisonResult, event1: Event, event2:
 
     # Rule 1: FIR Omission -> Downgrade severity
     if classification == "omission":
-        if event1.statement_type == "FIR" or event2.statement_type == "FIR":
-             severity = "Minor"
-             legal_basis = "The FIR is not substantive evidence. It may be used only to corroborate or contradict its maker, and omissions must be assessed cautiously in light of surrounding circumstances."
-        else:
-             severity = "Material"
-             legal_basis = "Omission of material facts in sworn testimony may amount to a contradiction."
+        severity, legal_basis = _omission_severity(event1.statement_type, event2.statement_type)
 
     # Rule 2: Contradiction logic
     if classification == "contradiction":
-        explanation_lower = explanation.lower()
+        topics = EXPLANATION_MATCHER.match(explanation)
         
         # Critical: Identity or Presence
-        if "identity" in explanation_lower or "presence" in explanation_lower or "role" in explanation_lower:
+        if "identity" in topics:
             severity = "Critical"
             legal_basis = "Contradiction regarding the identity or core role of the accused goes to the root of the prosecution case."
         
         # Material: Weapon or Timeline
-        elif "weapon" in explanation_lower or "gun" in explanation_lower or "knife" in explanation_lower:
+        elif "weapon" in topics:
             severity = "Material"
             legal_basis = "Material contradiction regarding the weapon used affects the credibility of the ocular account."
-        elif "time" in explanation_lower and "minor" not in explanation_lower:
+        elif "time" in topics and "minor" not in topics:
             severity = "Material"
             legal_basis = "Significant discrepancy in the timeline of events."
         
@@ -58,3 +102,24 @@ def apply_legal_heuristics(comparison: ComparisonResult, event1: Event, event2:
         legal_basis=legal_basis,
         source_sentence_refs=[event1.source_sentence, event2.source_sentence]
     )
+
+
+def omission_candidate_row(event: Event, other_statement_type: str, in_first: bool = True) -> ReportRow:
+    """
+    Reports an event that has no counterpart in the other statement as an
+    omission, without an LLM call. `in_first` tells which side of the
+    report the event belongs on.
+    """
+    severity, legal_basis = _omission_severity(event.statement_type, other_statement_type)
+    present = f"{event.statement_type}: {event.actor} {event.action}"
+    missing = f"{other_statement_type}: (not mentioned)"
+    return ReportRow(
+        # An event can go unaligned against several statements (/analyze/multi).
+        id=f"{event.event_id}-omitted-in-{other_statement_type}",
+        source_1=present if in_first else missing,
+        source_2=missing if in_first else present,
+        classification="omission",
+        severity=severity,
+        legal_basis=legal_basis,
+        source_sentence_refs=[event.source_sentence, ""] if in_first else ["", event.source_sentence],
+    )
@@ -9,10 +9,61 @@ def clean_text(text: str) -> str:
     text = re.sub(r'\s+', ' ', text).strip()
     return text
 
-def chunk_text(text: str, chunk_size: int = 2000) -> list[str]:
+# Sentence terminators: Latin . ! ?, Devanagari/Bengali danda and double
+# danda (। ॥), Urdu full stop (۔) and the CJK/full-width forms.
+SENTENCE_END = re.compile(
+    r'(?:(?<=[.!?।॥۔。！？])|(?<=[.!?।॥۔。！？]["\'”’)\]]))\s+'
+)
+
+def split_sentences(text: str) -> list[str]:
+    """
+    Splits text into sentences on terminal punctuation followed by
+    whitespace. Terminators and closing quotes stay with their sentence.
     """
-    Splits text into chunks if it's too long (not fully implemented for MVP, 
-    assuming short statements for now).
+    return [s for s in (part.strip() for part in SENTENCE_END.split(text)) if s]
+
+def _split_long_sentence(sentence: str, chunk_size: int) -> list[str]:
+    """Splits a sentence longer than chunk_size on word boundaries."""
+    pieces, current = [], ""
+    for word in sentence.split(" "):
+        if current and len(current) + 1 + len(word) > chunk_size:
+            pieces.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        pieces.append(current)
+    return pieces
+
+def chunk_text(text: str, chunk_size: int = 2000, overlap_sentences: int = 1) -> list[str]:
     """
-    # Simple placeholder for chunking logic
-    return [text]
+    Splits text into chunks of whole sentences, each at most about
+    chunk_size characters. Consecutive chunks share their last/first
+    `overlap_sentences` sentences, so an event described across a chunk
+    boundary is seen whole by at least one chunk.
+    Text that fits in one chunk is returned as [text].
+    """
+    if len(text) <= chunk_size:
+        return [text]
+
+    sentences = []
+    for sentence in split_sentences(text):
+        if len(sentence) > chunk_size:
+            sentences.extend(_split_long_sentence(sentence, chunk_size))
+        else:
+            sentences.append(sentence)
+
+    chunks = []
+    start = 0
+    while start < len(sentences):
+        end = start
+        length = 0
+        while end < len(sentences) and (end == start or length + 1 + len(sentences[end]) <= chunk_size):
+            length += len(sentences[end]) + 1
+            end += 1
+        chunks.append(" ".join(sentences[start:end]))
+        if end >= len(sentences):
+            break
+        # Step back for the overlap, but always make progress.
+        start = max(end - overlap_sentences, start + 1)
+    return chunks
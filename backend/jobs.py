@@ -0,0 +1,186 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from config import JOB_PROGRESS_INTERVAL_SECONDS
+from schemas import AnalyzeRequest, AnalysisReport
+
+class JobStore:
+    """
+    SQLite-backed store for analysis jobs, so queued work and finished
+    reports survive a worker restart.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # In WAL mode NORMAL only syncs at checkpoints, not on every commit;
+        # the database stays consistent and at worst loses the last writes
+        # on power loss, which resumed jobs redo anyway.
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                request_json TEXT NOT NULL,
+                progress_json TEXT,
+                report_json TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def create(self, request: AnalyzeRequest) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, request_json, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, "queued", request.model_dump_json(), now, now),
+            )
+            self._conn.commit()
+        return job_id
+
+    def update(self, job_id: str, **fields) -> None:
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, request_json, progress_json, report_json, error, created_at, updated_at "
+                "FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row[0],
+            "status": row[1],
+            "request": AnalyzeRequest.model_validate_json(row[2]),
+            "progress": json.loads(row[3]) if row[3] else None,
+            "report": AnalysisReport.model_validate_json(row[4]) if row[4] else None,
+            "error": row[5],
+            "created_at": row[6],
+            "updated_at": row[7],
+        }
+
+    def unfinished(self) -> List[str]:
+        """IDs of jobs that were queued or interrupted mid-run, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+
+class JobManager:
+    """
+    Bounded in-process worker pool that runs analysis jobs from a queue.
+    HTTP requests only enqueue work; `workers` tasks drain the queue at their
+    own pace, so bursts wait in the queue instead of tying up requests.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        runner: Callable[..., Awaitable[AnalysisReport]],
+        workers: int = 2,
+        progress_interval: float = JOB_PROGRESS_INTERVAL_SECONDS,
+    ):
+        self.store = store
+        self.runner = runner
+        self.workers = max(1, workers)
+        self.progress_interval = progress_interval
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        # Wakes long-polling clients when a job changes status.
+        self._status_events: Dict[str, asyncio.Event] = {}
+
+    async def start(self) -> None:
+        # Re-queue anything a previous process did not finish.
+        for job_id in self.store.unfinished():
+            self.store.update(job_id, status="queued")
+            self._queue.put_nowait(job_id)
+        self._tasks = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+        print(f"DEBUG: Job workers started ({self.workers}), {self._queue.qsize()} jobs resumed")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, request: AnalyzeRequest) -> str:
+        job_id = self.store.create(request)
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    async def wait_for_change(self, job_id: str, timeout: float) -> None:
+        """Blocks until the job's status changes or `timeout` seconds pass."""
+        event = self._status_events.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _set_status(self, job_id: str, status: str, **fields) -> None:
+        self.store.update(job_id, status=status, **fields)
+        event = self._status_events.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        job = self.store.get(job_id)
+        if job is None or job["status"] not in ("queued", "running"):
+            return
+        self._set_status(job_id, "running")
+
+        # Progress arrives once per compared pair. Writes run on the event
+        # loop, so they are throttled to one per progress_interval; the
+        # latest unwritten event is saved with the final status.
+        last_write = 0.0
+        pending: Optional[str] = None
+
+        def on_event(event: dict) -> None:
+            nonlocal last_write, pending
+            if event.get("type") not in ("extraction", "progress"):
+                return
+            pending = json.dumps(event)
+            now = time.monotonic()
+            if event["type"] == "extraction" or now - last_write >= self.progress_interval:
+                self.store.update(job_id, progress_json=pending)
+                last_write = now
+                pending = None
+
+        try:
+            report = await self.runner(job["request"], on_event=on_event)
+            final = {"progress_json": pending} if pending else {}
+            self._set_status(job_id, "completed", report_json=report.model_dump_json(), **final)
+        except asyncio.CancelledError:
+            # Shutdown mid-run: leave the job as running so start() resumes it.
+            raise
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            self._set_status(job_id, "failed", error=str(e))
@@ -0,0 +1,87 @@
+import unicodedata
+from collections import deque
+from typing import Dict, List, Optional, Set
+
+# Keyword tables map category -> {language code -> keywords}. Matching is by
+# substring, like `keyword in text.lower()`, which also suits the
+# agglutinative Indic languages where keywords carry suffixes.
+KeywordTable = Dict[str, Dict[str, List[str]]]
+
+
+def _normalize(text: str) -> str:
+    # NFC so precomposed and decomposed forms (e.g. Bengali য়) match alike.
+    return unicodedata.normalize("NFC", text.lower())
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over every keyword of every language in a table.
+
+    Built once; each lookup is a single pass over the text whose cost does
+    not grow with the number of keywords, and reports all categories with a
+    keyword anywhere in the text, overlapping matches included.
+    """
+
+    def __init__(self, table: KeywordTable):
+        self.categories_in_order = list(table)
+        self._rank = {category: i for i, category in enumerate(self.categories_in_order)}
+
+        # Trie: goto[state][char] -> state; outputs[state] -> categories
+        # of the keywords ending there.
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[Set[str]] = [set()]
+        keywords = set()
+        for category, by_language in table.items():
+            for words in by_language.values():
+                for word in filter(None, words):
+                    word = _normalize(word)
+                    keywords.add(word)
+                    state = 0
+                    for ch in word:
+                        if ch not in goto[state]:
+                            goto.append({})
+                            outputs.append(set())
+                            goto[state][ch] = len(goto) - 1
+                        state = goto[state][ch]
+                    outputs[state].add(category)
+
+        # Failure links, breadth-first; each state also inherits the
+        # outputs of its failure state (keywords that are suffixes of it).
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in goto[state].items():
+                queue.append(child)
+                target = fail[state]
+                while target and ch not in goto[target]:
+                    target = fail[target]
+                fail[child] = goto[target].get(ch, 0) if state else 0
+                outputs[child] |= outputs[fail[child]]
+
+        self.keyword_count = len(keywords)
+        self._goto = goto
+        self._fail = fail
+        self._outputs = [frozenset(o) for o in outputs]
+
+    def match(self, text: str) -> Set[str]:
+        """All categories with at least one keyword in `text`."""
+        if not text:
+            return set()
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        found: Set[str] = set()
+        state = 0
+        for ch in _normalize(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if outputs[state]:
+                found |= outputs[state]
+        return found
+
+    def first(self, text: str, default: Optional[str] = None) -> Optional[str]:
+        """The matched category listed first in the table, else `default`."""
+        found = self.match(text)
+        if not found:
+            return default
+        return min(found, key=self._rank.__getitem__)
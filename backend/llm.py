@@ -0,0 +1,342 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Optional
+
+import google.generativeai as genai
+from config import (
+    GEMINI_API_KEY,
+    GEMINI_MODEL_NAME,
+    LLM_RPM,
+    LLM_TPM,
+    LLM_MAX_CONCURRENCY,
+    LLM_CALL_TIMEOUT_SECONDS,
+    LLM_MAX_RETRIES,
+    LLM_BACKOFF_BASE_SECONDS,
+    LLM_BACKOFF_MAX_SECONDS,
+    LLM_BREAKER_FAILURES,
+    LLM_BREAKER_COOLDOWN_SECONDS,
+)
+
+if GEMINI_API_KEY:
+    genai.configure(api_key=GEMINI_API_KEY)
+
+# Single shared model instance, created lazily on first use.
+_model = None
+
+
+def get_model() -> genai.GenerativeModel:
+    global _model
+    if _model is None:
+        _model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+    return _model
+
+
+class LLMUnavailableError(Exception):
+    """The LLM could not answer: retries were exhausted or the circuit is open."""
+
+
+# Lower value = served first. Set llm_priority in a task (background jobs do)
+# and every LLM call made from it, and from tasks it spawns, inherits it.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+llm_priority: ContextVar[int] = ContextVar("llm_priority", default=PRIORITY_INTERACTIVE)
+
+# HTTP statuses worth retrying; google.api_core exceptions carry it as `code`.
+TRANSIENT_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def is_transient_error(error: BaseException) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    code = getattr(error, "code", None)
+    return isinstance(code, int) and code in TRANSIENT_STATUS_CODES
+
+
+def estimate_tokens(text: str) -> int:
+    # ~3 characters per token is conservative across English and Indic scripts.
+    return len(text) // 3 + 1
+
+
+class LLMScheduler:
+    """
+    Admits LLM calls from every analysis and job in the process against
+    shared requests-per-minute, tokens-per-minute and concurrency budgets.
+
+    Waiting calls are served by priority (interactive before background),
+    then in arrival order. Transient failures are retried with full-jitter
+    exponential backoff, and a 429 also pauses admission for everyone for
+    the backoff delay. After `breaker_failures` consecutive transient
+    failures the circuit opens: calls fail fast with LLMUnavailableError
+    until `breaker_cooldown` has passed, then a single trial call decides
+    whether it closes again.
+    """
+
+    WINDOW_SECONDS = 60.0
+
+    def __init__(
+        self,
+        rpm: int = LLM_RPM,
+        tpm: int = LLM_TPM,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        call_timeout: float = LLM_CALL_TIMEOUT_SECONDS,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff_base: float = LLM_BACKOFF_BASE_SECONDS,
+        backoff_max: float = LLM_BACKOFF_MAX_SECONDS,
+        breaker_failures: int = LLM_BREAKER_FAILURES,
+        breaker_cooldown: float = LLM_BREAKER_COOLDOWN_SECONDS,
+    ):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_concurrency = max(1, max_concurrency)
+        self.call_timeout = call_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker_failures = breaker_failures
+        self.breaker_cooldown = breaker_cooldown
+
+        self._loop = None
+        self._condition: Optional[asyncio.Condition] = None
+        self._waiters: list = []  # heap of [priority, seq, tokens]
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._request_times: deque = deque()
+        self._token_log: deque = deque()  # (time, tokens)
+        self._tokens_in_window = 0
+        self._paused_until = 0.0
+
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+        self.calls = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.failures = 0
+        self.rejected = 0
+
+    # --- budgets ---
+
+    def _get_condition(self) -> asyncio.Condition:
+        # asyncio primitives belong to one event loop; start afresh on a new one.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._condition = asyncio.Condition()
+            self._waiters = []
+            self._in_flight = 0
+        return self._condition
+
+    def _prune(self, now: float) -> None:
+        cutoff = now - self.WINDOW_SECONDS
+        while self._request_times and self._request_times[0] <= cutoff:
+            self._request_times.popleft()
+        while self._token_log and self._token_log[0][0] <= cutoff:
+            self._tokens_in_window -= self._token_log.popleft()[1]
+
+    def _admission_delay(self, tokens: int) -> Optional[float]:
+        """0 if a call of `tokens` may start now, else seconds to wait (None: until notified)."""
+        now = time.monotonic()
+        self._prune(now)
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self._in_flight >= self.max_concurrency:
+            return None
+        if self.rpm and len(self._request_times) >= self.rpm:
+            return self._request_times[0] + self.WINDOW_SECONDS - now
+        if self.tpm and self._token_log and self._tokens_in_window + tokens > self.tpm:
+            return self._token_log[0][0] + self.WINDOW_SECONDS - now
+        return 0
+
+    def _record_tokens(self, tokens: int) -> None:
+        self._token_log.append((time.monotonic(), tokens))
+        self._tokens_in_window += tokens
+
+    async def _acquire(self, tokens: int, priority: int) -> None:
+        condition = self._get_condition()
+        entry = [priority, next(self._seq), tokens]
+        async with condition:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    delay = self._admission_delay(tokens) if self._waiters[0] is entry else None
+                    if delay == 0:
+                        heapq.heappop(self._waiters)
+                        self._in_flight += 1
+                        self._request_times.append(time.monotonic())
+                        self._record_tokens(tokens)
+                        condition.notify_all()  # the next waiter may fit too
+                        return
+                    try:
+                        await asyncio.wait_for(condition.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                    condition.notify_all()
+                raise
+
+    async def _release(self) -> None:
+        condition = self._get_condition()
+        async with condition:
+            self._in_flight = max(0, self._in_flight - 1)
+            condition.notify_all()
+
+    # --- circuit breaker ---
+
+    def _check_breaker(self) -> bool:
+        """Raises if the circuit is open; returns True for the half-open trial call."""
+        if self._opened_at is None:
+            return False
+        if time.monotonic() - self._opened_at < self.breaker_cooldown or self._trial_in_flight:
+            self.rejected += 1
+            raise LLMUnavailableError("LLM circuit breaker is open after repeated failures; try again shortly.")
+        self._trial_in_flight = True
+        return True
+
+    def _on_success(self) -> None:
+        if self._opened_at is not None:
+            print("DEBUG: LLM circuit breaker closed")
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def _on_failure(self, trial: bool) -> None:
+        self.failures += 1
+        self._consecutive_failures += 1
+        if trial or self._consecutive_failures >= self.breaker_failures:
+            if self._opened_at is None or trial:
+                print(f"DEBUG: LLM circuit breaker opened after {self._consecutive_failures} consecutive failures")
+            self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    # --- calls ---
+
+    async def run(self, call: Callable[[], Awaitable[str]], tokens: int) -> str:
+        """
+        Runs `call` (one LLM request of about `tokens` prompt tokens) under
+        the shared budgets, retrying transient failures. Raises
+        LLMUnavailableError when the LLM cannot answer; other errors from
+        `call` propagate unchanged.
+        """
+        priority = llm_priority.get()
+        for attempt in range(self.max_retries + 1):
+            trial = self._check_breaker()
+            try:
+                await self._acquire(tokens, priority)
+            except BaseException:
+                if trial:
+                    self._trial_in_flight = False
+                raise
+            self.calls += 1
+            try:
+                result = await asyncio.wait_for(call(), self.call_timeout)
+            except Exception as e:
+                if not is_transient_error(e):
+                    if trial:
+                        self._trial_in_flight = False
+                    raise
+                self._on_failure(trial)
+                error = e
+            except BaseException:
+                if trial:
+                    self._trial_in_flight = False
+                raise
+            else:
+                self._on_success()
+                self._record_tokens(estimate_tokens(result or ""))
+                return result
+            finally:
+                await self._release()
+
+            if attempt == self.max_retries:
+                break
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+            if getattr(error, "code", None) == 429:
+                self.rate_limited += 1
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            self.retries += 1
+            print(f"DEBUG: LLM call failed ({type(error).__name__}: {error}); retry {attempt + 1} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+        raise LLMUnavailableError(f"LLM request failed after {self.max_retries + 1} attempts: {error}") from error
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        self._prune(now)
+        if self._opened_at is None:
+            breaker = "closed"
+        elif now - self._opened_at < self.breaker_cooldown:
+            breaker = "open"
+        else:
+            breaker = "half-open"
+        return {
+            "in_flight": self._in_flight,
+            "queued": len(self._waiters),
+            "requests_last_minute": len(self._request_times),
+            "tokens_last_minute": self._tokens_in_window,
+            "rpm_limit": self.rpm,
+            "tpm_limit": self.tpm,
+            "breaker": breaker,
+            "calls": self.calls,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "failures": self.failures,
+            "rejected": self.rejected,
+        }
+
+
+llm_scheduler = LLMScheduler()
+
+
+async def gather_or_cancel(coros) -> list:
+    """
+    asyncio.gather() for LLM fan-out that cancels the remaining calls as soon
+    as one fails, so a run aborted by LLMUnavailableError stops spending quota.
+    """
+    tasks = [asyncio.ensure_future(c) for c in coros]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+async def generate_text(prompt: str, json_mode: bool = False) -> str:
+    """
+    Sends a prompt to Gemini through the shared scheduler, without blocking
+    the event loop, and returns the raw response text. With `json_mode`, the
+    model is asked for a JSON body. Raises LLMUnavailableError if the LLM
+    is rate limited or failing beyond the retry budget.
+    """
+    generation_config = {"response_mime_type": "application/json"} if json_mode else None
+
+    async def _call() -> str:
+        response = await get_model().generate_content_async(
+            prompt,
+            generation_config=generation_config
+        )
+        return response.text
+
+    return await llm_scheduler.run(_call, estimate_tokens(prompt))
+
+
+def clean_json_response(response_text: str) -> str:
+    """Strips markdown code fences the LLM sometimes wraps around JSON."""
+    response_text = response_text.strip()
+    if response_text.startswith("```json"):
+        response_text = response_text[7:]  # Remove ```json
+    if response_text.startswith("```"):
+        response_text = response_text[3:]  # Remove ```
+    if response_text.endswith("```"):
+        response_text = response_text[:-3]  # Remove trailing ```
+    return response_text.strip()
@@ -1,28 +1,56 @@
+import asyncio
+import itertools
+import json
+from contextlib import asynccontextmanager
+from typing import Callable, Optional
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import UploadFile, File, Form
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from schemas import (
     AnalyzeRequest,
+    MultiAnalyzeRequest,
     AnalysisReport,
     ReportRow,
     ExtractedEvents,
     UploadResponse,
     SpeechToTextResponse,
+    JobSubmitResponse,
+    JobStatusResponse,
 )
 from ingestion import clean_text
-from extraction import extract_events_from_text
-from compare import compare_events
-from heuristics import apply_legal_heuristics
-from report import generate_final_report
-from filters import should_compare_events, group_omissions, comparison_cache
+from extraction import extract_events_from_statements, extraction_cache, ExtractionError
+from compare import compare_event_pairs
+from heuristics import apply_legal_heuristics, omission_candidate_row
+from report import generate_final_report, group_and_prioritize_rows
+from filters import select_candidate_pairs, align_events, group_omissions, comparison_cache
 from translation import detect_language, translate_to_english, translate_text
-from ocr import extract_text_from_file
-from config import SARVAM_API_KEY, SARVAM_STT_URL, SARVAM_STT_MODEL
+from ocr import extract_text_from_file, stream_text_from_file, close_ocr_client, ocr_cache
+from stt import transcribe_audio, stream_transcription, close_stt_client
+from config import SARVAM_API_KEY, JOB_WORKERS, JOB_DB_PATH, PAIR_SELECTION
+from jobs import JobStore, JobManager
+from llm import llm_scheduler, llm_priority, PRIORITY_BACKGROUND, LLMUnavailableError
+from uploads import UploadSizeLimitMiddleware, upload_buffer
+
+job_manager: Optional[JobManager] = None
+
 
-import requests
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global job_manager
+    job_manager = JobManager(JobStore(JOB_DB_PATH), runner=run_background_analysis, workers=JOB_WORKERS)
+    await job_manager.start()
+    yield
+    await job_manager.stop()
+    await close_ocr_client()
+    await close_stt_client()
 
-app = FastAPI(title="Sakshya AI", description="AI-assisted legal decision support.")
+
+app = FastAPI(title="Sakshya AI", description="AI-assisted legal decision support.", lifespan=lifespan)
+
+app.add_middleware(UploadSizeLimitMiddleware)
 
 # CORS - Allow all for local dev
 app.add_middleware(
@@ -33,11 +61,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(LLMUnavailableError)
+async def llm_unavailable_handler(request, exc: LLMUnavailableError):
+    # Rate limited or failing LLM: tell the client to retry rather than
+    # returning a report built on missing comparisons.
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"LLM temporarily unavailable: {exc}"},
+        headers={"Retry-After": str(int(llm_scheduler.breaker_cooldown))},
+    )
+
+
+@app.exception_handler(ExtractionError)
+async def extraction_error_handler(request, exc: ExtractionError):
+    # No report at all rather than one where the failed statement's
+    # missing events show up as omissions.
+    return JSONResponse(status_code=502, content={"detail": f"Event extraction failed: {exc}"})
+
+
 @app.get("/")
 def health_check():
     return {"status": "ok", "message": "Sakshya AI Backend Running"}
 
 
+@app.get("/cache-stats")
+def cache_stats():
+    """Hit/miss/eviction counters for the in-process caches."""
+    return {"caches": [comparison_cache.stats(), extraction_cache.stats(), ocr_cache.stats()]}
+
+
+@app.get("/llm-stats")
+def llm_stats():
+    """Budget usage, queue length and circuit breaker state of the LLM scheduler."""
+    return llm_scheduler.stats()
+
+
 @app.post("/speech-to-text", response_model=SpeechToTextResponse)
 async def speech_to_text(
     file: UploadFile = File(...),
@@ -56,62 +114,24 @@ async def speech_to_text(
         )
 
     try:
-        audio_bytes = await file.read()
-
-        # Match Sarvam curl example:
-        # curl -X POST https://api.sarvam.ai/speech-to-text \
-        #   -H "api-subscription-key: <apiKey>" \
-        #   -H "Content-Type: multipart/form-data" \
-        #   -F file=@<path>
-        headers = {
-            "api-subscription-key": SARVAM_API_KEY,
-        }
-
-        files = {
-            "file": (
+        with upload_buffer(file) as contents:
+            result = await transcribe_audio(
+                contents,
                 file.filename or "audio.wav",
-                audio_bytes,
                 file.content_type or "audio/mpeg",
             )
-        }
-
-        # Basic STT call as per docs – no extra form fields required.
-        resp = requests.post(SARVAM_STT_URL, headers=headers, files=files, timeout=60)
-
-        if resp.status_code != 200:
-            try:
-                err_body = resp.json()
-            except Exception:
-                err_body = resp.text
-            raise HTTPException(
-                status_code=502,
-                detail=f"Sarvam STT request failed with status {resp.status_code}: {err_body}",
-            )
 
-        try:
-            payload = resp.json()
-        except Exception as e:  # pragma: no cover - defensive
-            raise HTTPException(status_code=502, detail=f"Invalid JSON from Sarvam STT: {e}")
-
-        # Try common field names for the transcribed text.
-        text = (
-            payload.get("text")
-            or payload.get("transcript")
-            or payload.get("transcription")
-            or payload.get("output_text")
-        )
-
-        if not text:
+        if not result.get("text"):
             raise HTTPException(
                 status_code=502,
                 detail="Sarvam STT response did not contain a transcription field.",
             )
 
         return SpeechToTextResponse(
-            text=text,
-            detected_language=payload.get("language") or payload.get("detected_language"),
-            model=payload.get("model") or SARVAM_STT_MODEL,
-            duration_seconds=payload.get("duration") or payload.get("duration_seconds"),
+            text=result["text"],
+            detected_language=result["detected_language"],
+            model=result["model"],
+            duration_seconds=result["duration_seconds"],
         )
 
     except HTTPException:
@@ -120,27 +140,76 @@ async def speech_to_text(
         print(f"Speech-to-text error: {e}")
         raise HTTPException(status_code=500, detail=f"Internal STT error: {e}")
 
+
+@app.post("/speech-to-text/stream")
+async def speech_to_text_stream(
+    file: UploadFile = File(...),
+    statement_type: str = Form("generic"),
+):
+    """
+    Streaming variant of /speech-to-text. Responds with NDJSON: one
+    {"type": "segment"} line per transcribed segment as soon as it is ready
+    (segments of long recordings may finish out of order; each carries its
+    index and start/end seconds), then a {"type": "result"} line with the
+    stitched transcript (or {"type": "error"} if transcription failed).
+    """
+    if not SARVAM_API_KEY:
+        raise HTTPException(
+            status_code=500,
+            detail="Sarvam STT is not configured (missing SARVAM_API_KEY)",
+        )
+
+    async def _stream():
+        try:
+            with upload_buffer(file) as contents:
+                async for event in stream_transcription(
+                    contents,
+                    file.filename or "audio.wav",
+                    file.content_type or "audio/mpeg",
+                ):
+                    yield json.dumps(event, ensure_ascii=False, default=str) + "\n"
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            print(f"Speech-to-text stream error: {detail}")
+            yield json.dumps({"type": "error", "detail": detail}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
+
+
+def _validate_page_range(first_page: int, last_page: Optional[int]) -> None:
+    if first_page < 1 or (last_page is not None and last_page < first_page):
+        raise HTTPException(status_code=400, detail="Invalid page range")
+
+
 @app.post("/upload-document", response_model=UploadResponse)
 async def upload_document(
     file: UploadFile = File(...),
-    statement_type: str = Form(...)
+    statement_type: str = Form(...),
+    first_page: int = Form(1),
+    last_page: Optional[int] = Form(None),
 ):
     """
     Handles PDF/Image upload, extracts text via OCR or PDF parsing.
+    `first_page`/`last_page` (1-based, inclusive) limit which PDF pages are read.
     """
     print(f"Received file: {file.filename}, Type: {statement_type}")
+    _validate_page_range(first_page, last_page)
     
     try:
-        contents = await file.read()
-        extraction_result = await extract_text_from_file(contents, file.filename)
+        with upload_buffer(file) as contents:
+            extraction_result = await extract_text_from_file(contents, file.filename, first_page, last_page)
         
         if extraction_result["method"] == "error":
             # Pass through specific errors (like Tesseract missing)
             raise HTTPException(status_code=500, detail=extraction_result["error"])
             
+        message = f"Text extracted using {extraction_result['method']} ({extraction_result['confidence']} confidence)"
+        if extraction_result.get("incomplete"):
+            message += f"; incomplete: {extraction_result['error']}"
+
         return UploadResponse(
             filename=file.filename,
-            message=f"Text extracted using {extraction_result['method']} ({extraction_result['confidence']} confidence)",
+            message=message,
             content_preview=extraction_result["text"]  # Send full text as 'preview' for editing
         )
     except HTTPException:
@@ -149,8 +218,54 @@ async def upload_document(
         print(f"Upload Error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
-@app.post("/analyze", response_model=AnalysisReport)
-async def analyze_statements(request: AnalyzeRequest):
+@app.post("/upload-document/stream")
+async def upload_document_stream(
+    file: UploadFile = File(...),
+    statement_type: str = Form(...),
+    first_page: int = Form(1),
+    last_page: Optional[int] = Form(None),
+):
+    """
+    Streaming variant of /upload-document. Responds with NDJSON: one
+    {"type": "page"} line per page as soon as its text is ready, then a
+    {"type": "result"} line with the assembled text and confidence.
+    """
+    print(f"Received file (streaming): {file.filename}, Type: {statement_type}")
+    _validate_page_range(first_page, last_page)
+
+    async def _stream():
+        with upload_buffer(file) as contents:
+            async for event in stream_text_from_file(contents, file.filename, first_page, last_page):
+                yield json.dumps(event, ensure_ascii=False, default=str) + "\n"
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
+
+
+def select_pairs(events1, events2, type1: str, type2: str):
+    """
+    Chooses the event pairs to send to the LLM (per PAIR_SELECTION).
+    Returns (pairs, omission candidate rows, stats); only alignment
+    produces omission candidates, and only when both statements have
+    events: against an empty side every event would be "omitted".
+    """
+    if PAIR_SELECTION == "prefilter":
+        pairs, stats = select_candidate_pairs(events1, events2)
+        return pairs, [], stats
+
+    pairs, unaligned1, unaligned2, stats = align_events(events1, events2)
+    if not events1 or not events2:
+        return pairs, [], stats
+    omission_rows = (
+        [omission_candidate_row(e, type2, in_first=True) for e in unaligned1]
+        + [omission_candidate_row(e, type1, in_first=False) for e in unaligned2]
+    )
+    return pairs, omission_rows, stats
+
+
+async def run_analysis(
+    request: AnalyzeRequest,
+    on_event: Optional[Callable[[dict], None]] = None,
+) -> AnalysisReport:
     """
     Main pipeline:
     1. Clean texts.
@@ -158,7 +273,14 @@ async def analyze_statements(request: AnalyzeRequest):
     3. Compare events (LLM).
     4. Apply Legal Heuristics.
     5. Generate Report.
+
+    If given, `on_event` receives progress events (extraction done, pairs
+    compared, each discrepancy row) while the pipeline runs.
     """
+    def emit(event: dict) -> None:
+        if on_event is not None:
+            on_event(event)
+
     print(f"!!! RECEIVING REQUEST ON PORT 8005 !!! {request.statement_1_type} vs {request.statement_2_type}")
 
     # 1. Ingestion & Language Detection
@@ -178,10 +300,17 @@ async def analyze_statements(request: AnalyzeRequest):
 
     # 2. Extraction (on English text)
     print("Extracting events...")
-    events1 = await extract_events_from_text(text1, request.statement_1_type)
-    events2 = await extract_events_from_text(text2, request.statement_2_type)
+    previous_texts = [
+        clean_text(previous) if previous is not None else None
+        for previous in (request.previous_statement_1_text, request.previous_statement_2_text)
+    ]
+    events1, events2 = await extract_events_from_statements([
+        (text1, request.statement_1_type),
+        (text2, request.statement_2_type),
+    ], previous_texts)
     
     print(f"Extracted {len(events1)} events from Doc 1 and {len(events2)} events from Doc 2.")
+    emit({"type": "extraction", "events_1": len(events1), "events_2": len(events2)})
 
     # 3. Comparison & 4. Heuristics
     # Naive O(N*M) comparison for MVP. 
@@ -200,31 +329,49 @@ async def analyze_statements(request: AnalyzeRequest):
     # Or strict contradiction search.
 
     # 3. Suppression Filters (Pre-LLM) & Comparison
-    processed_count = 0
-    skipped_count = 0
-    
     print(f"DEBUG: Starting comparison loop for {len(events1)} x {len(events2)} events")
     
-    for i, e1 in enumerate(events1):
-        for j, e2 in enumerate(events2):
-            # --- OBJECTIVE 1: SUPPRESSION RULES ---
-            # print(f"DEBUG: Checking filter for {e1.event_id} vs {e2.event_id}")
-            if not should_compare_events(e1, e2):
-                skipped_count += 1
-                # print(f"DEBUG: Skipped {e1.event_id} vs {e2.event_id}")
-                continue
-
-            processed_count += 1
-            print(f"DEBUG: Comparing {e1.event_id} vs {e2.event_id}")
-            comparison_result = await compare_events(e1, e2)
-            
-            # Use Heuristics
-            row = apply_legal_heuristics(comparison_result, e1, e2)
-            
-            if row.classification != "consistent":
-                 report_rows.append(row)
-                 
+    # --- OBJECTIVE 1: SUPPRESSION RULES ---
+    # Alignment (or similarity pre-filter) + should_compare_events, computed locally.
+    candidate_pairs, omission_rows, prefilter_stats = select_pairs(
+        events1, events2, request.statement_1_type, request.statement_2_type
+    )
+    processed_count = prefilter_stats["candidate_pairs"]
+    skipped_count = prefilter_stats["pruned_pairs"]
+    print(f"DEBUG: Pair selection ({PAIR_SELECTION}) kept {processed_count}/{prefilter_stats['total_pairs']} pairs "
+          f"(pruning ratio {prefilter_stats['pruning_ratio']}), {len(omission_rows)} omission candidates")
+    for row in omission_rows:
+        emit({"type": "row", "row": row.model_dump()})
+
+    print(f"DEBUG: Comparing {processed_count} event pairs concurrently")
+    emit({"type": "progress", "compared": 0, "total": processed_count})
+    compared = 0
+
+    def on_comparison(index: int, comparison_result) -> None:
+        nonlocal compared
+        compared += 1
+        emit({"type": "progress", "compared": compared, "total": processed_count})
+        if on_event is None:
+            return
+        e1, e2 = candidate_pairs[index]
+        row = apply_legal_heuristics(comparison_result, e1, e2)
+        if row.classification != "consistent":
+            emit({"type": "row", "row": row.model_dump()})
+
+    comparison_results = await compare_event_pairs(candidate_pairs, on_result=on_comparison)
+
+    for (e1, e2), comparison_result in zip(candidate_pairs, comparison_results):
+        # Use Heuristics
+        row = apply_legal_heuristics(comparison_result, e1, e2)
+
+        if row.classification != "consistent":
+            report_rows.append(row)
+
+    # Unaligned events after the LLM-confirmed rows, which take priority.
+    report_rows.extend(omission_rows)
+
     print(f"Comparison Stats: processed={processed_count}, skipped={skipped_count}, discrepancies={len(report_rows)}")
+    print(f"DEBUG: Comparison cache: {comparison_cache.stats()}")
 
     # --- OBJECTIVE 2: GROUPING ---
     # report_rows = group_omissions(report_rows) # Placeholder for complex logic if implemented
@@ -241,6 +388,148 @@ async def analyze_statements(request: AnalyzeRequest):
 
     return report
 
+
+async def run_background_analysis(
+    request: AnalyzeRequest,
+    on_event: Optional[Callable[[dict], None]] = None,
+) -> AnalysisReport:
+    """run_analysis for queued jobs: its LLM calls yield to interactive requests."""
+    llm_priority.set(PRIORITY_BACKGROUND)
+    return await run_analysis(request, on_event=on_event)
+
+
+@app.post("/analyze", response_model=AnalysisReport)
+async def analyze_statements(request: AnalyzeRequest):
+    return await run_analysis(request)
+
+
+@app.post("/analyze/multi", response_model=AnalysisReport)
+async def analyze_multiple_statements(request: MultiAnalyzeRequest):
+    """
+    Compares every pair of a witness's statements (e.g. FIR, 161, 164 and
+    deposition) in one call. Each statement is extracted exactly once, all
+    extractions run concurrently, and the candidate pairs of every stage
+    pair are compared together. Rows are prioritized per stage pair and
+    returned in statement order.
+    """
+    print(f"DEBUG: Multi-statement analysis: {[s.statement_type for s in request.statements]}")
+
+    statements = [(clean_text(s.text), s.statement_type) for s in request.statements]
+    detected_lang = detect_language(" ".join(text[:500] for text, _ in statements))
+    print(f"DEBUG: Detected Language: {detected_lang}")
+
+    event_lists = await extract_events_from_statements(statements)
+    print(f"Extracted events per statement: {[len(events) for events in event_lists]}")
+
+    stage_pairs = list(itertools.combinations(range(len(statements)), 2))
+    candidate_pairs = []
+    pair_stages = []
+    omissions_by_stage = {}
+    for i, j in stage_pairs:
+        pairs, omissions_by_stage[(i, j)], prefilter_stats = select_pairs(
+            event_lists[i], event_lists[j], statements[i][1], statements[j][1]
+        )
+        print(f"DEBUG: {statements[i][1]} vs {statements[j][1]}: pair selection kept "
+              f"{prefilter_stats['candidate_pairs']}/{prefilter_stats['total_pairs']} pairs")
+        candidate_pairs.extend(pairs)
+        pair_stages.extend([(i, j)] * len(pairs))
+
+    comparison_results = await compare_event_pairs(candidate_pairs)
+
+    rows_by_stage = {stage: [] for stage in stage_pairs}
+    for stage, (e1, e2), comparison_result in zip(pair_stages, candidate_pairs, comparison_results):
+        row = apply_legal_heuristics(comparison_result, e1, e2)
+        if row.classification != "consistent":
+            rows_by_stage[stage].append(row)
+
+    report_rows = []
+    for stage in stage_pairs:
+        report_rows.extend(group_and_prioritize_rows(rows_by_stage[stage] + omissions_by_stage[stage]))
+
+    report = generate_final_report(report_rows, detected_lang, prioritize=False)
+    report.analysis_language = detected_lang
+    return report
+
+
+@app.post("/analyze/stream")
+async def analyze_statements_stream(request: AnalyzeRequest):
+    """
+    Streaming variant of /analyze. Responds with NDJSON: progress events and
+    each discrepancy row as soon as it is found, then a final
+    {"type": "report"} line holding the prioritized AnalysisReport
+    (or {"type": "error"} if the pipeline failed).
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def _produce() -> None:
+        try:
+            report = await run_analysis(request, on_event=queue.put_nowait)
+            queue.put_nowait({"type": "report", "report": report.model_dump()})
+        except Exception as e:
+            print(f"Streaming analysis error: {e}")
+            queue.put_nowait({"type": "error", "detail": str(e)})
+        finally:
+            queue.put_nowait(None)
+
+    async def _stream():
+        task = asyncio.create_task(_produce())
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        finally:
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
+
+@app.post("/jobs", response_model=JobSubmitResponse, status_code=202)
+async def submit_analysis_job(request: AnalyzeRequest):
+    """
+    Queues an analysis to run in the background worker pool and returns
+    immediately with a job id to poll.
+    """
+    job_id = job_manager.submit(request)
+    return JobSubmitResponse(job_id=job_id, status="queued")
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_analysis_job(job_id: str, wait: float = 0):
+    """
+    Returns job status, latest progress and, once completed, the report.
+    With `wait` (seconds, max 30) the call long-polls until the status changes.
+    """
+    job = job_manager.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if wait > 0 and job["status"] in ("queued", "running"):
+        await job_manager.wait_for_change(job_id, timeout=min(wait, 30))
+        job = job_manager.store.get(job_id)
+    return JobStatusResponse(
+        job_id=job["job_id"],
+        status=job["status"],
+        created_at=job["created_at"],
+        updated_at=job["updated_at"],
+        progress=job["progress"],
+        error=job["error"],
+        report=job["report"],
+    )
+
+
+@app.get("/jobs/{job_id}/report", response_model=AnalysisReport)
+async def get_analysis_job_report(job_id: str):
+    job = job_manager.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=f"Analysis job failed: {job['error']}")
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Analysis job is {job['status']}")
+    return job["report"]
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,15 +1,75 @@
+import asyncio
+import hashlib
 import io
+import json
+import mmap
 import os
-from typing import List, Tuple
+import tempfile
+from collections import deque
+from contextlib import contextmanager
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Set, Tuple
 
-import requests
+import cv2
+import httpx
+import numpy as np
 from PIL import Image
 import pdfplumber
-from pdf2image import convert_from_bytes
-from langdetect import detect_langs
+from pdf2image import convert_from_path, pdfinfo_from_path
 
+from config import (
+    OCR_MAX_CONCURRENCY,
+    OCR_PAGE_TIMEOUT_SECONDS,
+    OCR_MAX_RETRIES,
+    PDF_PAGE_MIN_TEXT_CHARS,
+    OCR_CACHE_PATH,
+    OCR_CACHE_MAX_BYTES,
+    OCR_PREPROCESS,
+    OCR_BINARIZE,
+    OCR_ENCODING,
+    OCR_JPEG_QUALITY,
+)
+from cache import DiskCache
+from translation import detect_language_with_confidence
 
-def _resize_image_max(image: Image.Image, max_dim: int = 1600) -> Image.Image:
+# Longest side, in pixels, of page images sent to OCR; part of every OCR cache key.
+OCR_MAX_DIM = 1600
+
+# Persistent cache of whole-file results and of individual page OCR results.
+ocr_cache = DiskCache("ocr", OCR_CACHE_PATH, OCR_CACHE_MAX_BYTES)
+
+
+def _ocr_cache_key(kind: str, digest: str, **settings) -> str:
+    payload = json.dumps([kind, digest, sorted(settings.items())], default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+# Shared keep-alive client for the OCR host, created on first use.
+_ocr_client: Optional[httpx.AsyncClient] = None
+_ocr_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _get_ocr_client() -> Tuple[httpx.AsyncClient, asyncio.Semaphore]:
+    global _ocr_client, _ocr_semaphore
+    if _ocr_client is None:
+        _ocr_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=OCR_MAX_CONCURRENCY,
+                max_keepalive_connections=OCR_MAX_CONCURRENCY,
+            ),
+            timeout=OCR_PAGE_TIMEOUT_SECONDS,
+        )
+        _ocr_semaphore = asyncio.Semaphore(OCR_MAX_CONCURRENCY)
+    return _ocr_client, _ocr_semaphore
+
+
+async def close_ocr_client() -> None:
+    global _ocr_client, _ocr_semaphore
+    if _ocr_client is not None:
+        await _ocr_client.aclose()
+    _ocr_client = None
+    _ocr_semaphore = None
+
+
+def _resize_image_max(image: Image.Image, max_dim: int = OCR_MAX_DIM) -> Image.Image:
     w, h = image.size
     max_current = max(w, h)
     if max_current <= max_dim:
@@ -17,32 +77,195 @@ def _resize_image_max(image: Image.Image, max_dim: int = 1600) -> Image.Image:
     scale = max_dim / max_current
     new_w = int(w * scale)
     new_h = int(h * scale)
-    return image.resize((new_w, new_h), Image.LANCZOS)
+    # reducing_gap lets Pillow shrink by an integer factor first, then LANCZOS the rest.
+    return image.resize((new_w, new_h), Image.LANCZOS, reducing_gap=3.0)
+
+
+def _binary_stream(file_bytes: bytes):
+    """
+    File-like view of the upload. Memory-mapped uploads (see uploads.py) are
+    read in place, since wrapping them in BytesIO would copy the whole file.
+    """
+    if isinstance(file_bytes, mmap.mmap):
+        file_bytes.seek(0)
+        return file_bytes
+    return io.BytesIO(file_bytes)
+
+
+def _open_image_reduced(file_bytes: bytes, max_dim: int = OCR_MAX_DIM) -> Image.Image:
+    """
+    Decodes an uploaded image no larger than needed for OCR. JPEGs use
+    draft mode, which scales by 1/2, 1/4 or 1/8 inside the decoder, so a
+    phone photo never gets fully decoded at 12-50 MP.
+    """
+    img = Image.open(_binary_stream(file_bytes))
+    w, h = img.size
+    if img.format == "JPEG" and max(w, h) > max_dim:
+        scale = max_dim / max(w, h)
+        # draft() keeps the result at least this large, so quality is preserved.
+        img.draft("L" if OCR_PREPROCESS else "RGB", (int(w * scale), int(h * scale)))
+    return _resize_image_max(img, max_dim)
+
+
+def _page_span(page_count: int, first_page: int, last_page: Optional[int]) -> range:
+    """1-based, inclusive page numbers to process, clipped to the document."""
+    last = page_count if last_page is None else min(last_page, page_count)
+    return range(max(first_page, 1), last + 1)
+
+
+def _pdf_text_pages(file_bytes: bytes, first_page: int = 1, last_page: Optional[int] = None) -> List[Tuple[int, str]]:
+    """Text layer of each requested page as (page number, text)."""
+    with pdfplumber.open(_binary_stream(file_bytes)) as pdf:
+        return [
+            (page_no, pdf.pages[page_no - 1].extract_text() or "")
+            for page_no in _page_span(len(pdf.pages), first_page, last_page)
+        ]
+
+
+def _pdf_page_count(pdf_path: str) -> int:
+    return int(pdfinfo_from_path(pdf_path)["Pages"])
+
+
+def _rasterize_pdf_page(pdf_path: str, page_no: int, max_dim: int = OCR_MAX_DIM) -> Optional[Image.Image]:
+    # Render straight to the OCR size (longest side = max_dim) rather than at a
+    # fixed dpi followed by a resize; grayscale when preprocessing discards colour anyway.
+    images = convert_from_path(
+        pdf_path,
+        first_page=page_no,
+        last_page=page_no,
+        size=max_dim,
+        grayscale=OCR_PREPROCESS,
+    )
+    return images[0] if images else None
+
+
+def _encode_png(img: Image.Image) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _skew_angle(ink_mask: np.ndarray) -> float:
+    """Dominant text skew in degrees from the min-area rectangle around the ink."""
+    points = cv2.findNonZero(ink_mask)
+    if points is None or len(points) < 50:
+        return 0.0
+    angle = cv2.minAreaRect(points)[-1]
+    # OpenCV reports the angle in [0, 90) or [-90, 0) depending on version;
+    # either way the rectangle is the same modulo 90, so fold into [-45, 45).
+    return float((angle + 45) % 90 - 45)
+
+
+def _preprocess_for_ocr(img: Image.Image) -> Tuple[bytes, dict]:
+    """
+    Prepares a page for OCR: grayscale, optional adaptive binarization,
+    deskew, border cropping and compact encoding. Returns the bytes to send
+    and a summary including the payload size.
+    """
+    gray = np.asarray(img.convert("L"))
+    _, ink_mask = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+
+    # Deskew small tilts only; larger angles are more likely layout than skew.
+    # Rotation happens before binarization so thin strokes survive interpolation.
+    angle = _skew_angle(ink_mask)
+    if 0.5 <= abs(angle) <= 10:
+        h, w = gray.shape
+        matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+        gray = cv2.warpAffine(gray, matrix, (w, h), flags=cv2.INTER_LINEAR, borderValue=255)
+        ink_mask = cv2.warpAffine(ink_mask, matrix, (w, h), flags=cv2.INTER_NEAREST, borderValue=0)
+    else:
+        angle = 0.0
+
+    # Crop empty borders around the ink, keeping a small margin.
+    points = cv2.findNonZero(ink_mask)
+    if points is not None:
+        x, y, w, h = cv2.boundingRect(points)
+        margin = 16
+        gray = gray[max(y - margin, 0):y + h + margin, max(x - margin, 0):x + w + margin]
+
+    if OCR_BINARIZE:
+        page = cv2.adaptiveThreshold(
+            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 10
+        )
+    else:
+        page = gray
+
+    if OCR_ENCODING == "jpeg" and not OCR_BINARIZE:
+        ok, encoded = cv2.imencode(".jpg", page, [cv2.IMWRITE_JPEG_QUALITY, OCR_JPEG_QUALITY])
+        encoding = "jpeg"
+    else:
+        params = [cv2.IMWRITE_PNG_COMPRESSION, 9]
+        if OCR_BINARIZE:
+            params += [cv2.IMWRITE_PNG_BILEVEL, 1]
+        ok, encoded = cv2.imencode(".png", page, params)
+        encoding = "png"
+    if not ok:
+        raise ValueError("Failed to encode preprocessed page")
+
+    payload = encoded.tobytes()
+    return payload, {
+        "encoding": encoding,
+        "binarized": OCR_BINARIZE,
+        "deskew_degrees": round(angle, 2),
+        "size": [int(page.shape[1]), int(page.shape[0])],
+        "payload_bytes": len(payload),
+    }
 
 
-def _image_from_pdf_bytes(file_bytes: bytes, max_pages: int = 3, dpi: int = 150) -> List[Image.Image]:
-    images = convert_from_bytes(file_bytes, dpi=dpi, first_page=1, last_page=max_pages)
-    return [_resize_image_max(img) for img in images]
+def _prepare_ocr_payload(img: Image.Image, measure_baseline: bool = False) -> Tuple[bytes, dict]:
+    if not OCR_PREPROCESS:
+        payload = _encode_png(img)
+        return payload, {"encoding": "png", "payload_bytes": len(payload)}
+    payload, info = _preprocess_for_ocr(img)
+    if measure_baseline:
+        # Size of the unprocessed full-colour PNG we used to upload, for comparison.
+        info["original_png_bytes"] = len(_encode_png(img))
+    return payload, info
 
 
-def _remote_paddle_ocr(img: Image.Image, url: str, timeout: int = 30) -> Tuple[str, float, object]:
+async def _remote_paddle_ocr(
+    img: Image.Image,
+    url: str,
+    timeout: float = OCR_PAGE_TIMEOUT_SECONDS,
+    retries: int = OCR_MAX_RETRIES,
+) -> Tuple[str, float, object]:
     if not url:
         return "", 0.0, {"error": "no_url"}
     try:
-        buf = io.BytesIO()
-        img.save(buf, format="PNG")
-        buf.seek(0)
-        # files = {"file": ("image.png", buf, "image/png")}
-        # resp = requests.post(url, files=files, timeout=timeout)
-        
+        # Preprocessing and encoding are CPU-bound; keep them off the event loop.
+        debug_flag = os.getenv('PADDLE_OCR_DEBUG', '').lower() in ('1', 'true', 'yes')
+        payload, payload_info = await asyncio.to_thread(_prepare_ocr_payload, img, debug_flag)
+        print(f"DEBUG: OCR payload {payload_info}")
+
+        # Identical page images (e.g. unchanged pages of an edited PDF) reuse
+        # their earlier OCR result instead of another remote call.
+        page_key = _ocr_cache_key("page", hashlib.sha256(payload).hexdigest(), url=url)
+        cached_page = ocr_cache.get(page_key)
+        if cached_page is not None:
+            return cached_page["text"], cached_page["confidence"], {"status_code": 200, "cached": True, "payload": payload_info}
+
         # FIX: Send as raw binary (octet-stream) to match the curl command provided
         headers = {
             "Content-Type": "application/octet-stream", 
             "Accept": "application/json"
         }
-        resp = requests.post(url, data=buf.getvalue(), headers=headers, timeout=timeout)
+        client, semaphore = _get_ocr_client()
+        resp = None
+        for attempt in range(retries + 1):
+            try:
+                async with semaphore:
+                    resp = await client.post(url, content=payload, headers=headers, timeout=timeout)
+                # Retry only on gateway/overload errors; other statuses are final.
+                if resp.status_code not in (429, 502, 503, 504) or attempt == retries:
+                    break
+                print(f"Remote PaddleOCR returned status {resp.status_code}; retrying")
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                if attempt == retries:
+                    raise
+                print(f"Remote PaddleOCR transient error: {e}; retrying")
+            await asyncio.sleep(0.5 * (2 ** attempt))
         
-        resp_info = {"status_code": resp.status_code}
+        resp_info = {"status_code": resp.status_code, "payload": payload_info}
         # try to parse JSON body, otherwise return text
         try:
             data = resp.json()
@@ -62,109 +285,282 @@ def _remote_paddle_ocr(img: Image.Image, url: str, timeout: int = 30) -> Tuple[s
                 conf = float(data.get("confidence") or data.get("avg_conf") or 0.0)
         except Exception:
             conf = 0.0
-        return text.strip(), conf, resp_info
+        text = text.strip()
+        # Like whole files, pages that OCR'd to nothing are not cached, so a
+        # transient blank result is retried on the next upload.
+        if text:
+            ocr_cache.set(page_key, {"text": text, "confidence": conf})
+        return text, conf, resp_info
     except Exception as e:
         print(f"Remote PaddleOCR error: {e}")
         return "", 0.0, {"error": str(e)}
 
 
 def _detect_language_summary(text: str) -> Tuple[str, str]:
-    try:
-        langs = detect_langs(text)
-        if not langs:
-            return "en", "low"
-        top = langs[0]
-        code = top.lang
-        prob = top.prob
-        supported = ["en", "hi", "ml", "ta", "te", "kn", "bn"]
-        if code not in supported:
-            return "en", "low"
-        if prob > 0.85:
-            conf = "high"
-        elif prob > 0.6:
-            conf = "medium"
+    code, prob = detect_language_with_confidence(text)
+    if prob > 0.85:
+        conf = "high"
+    elif prob > 0.6:
+        conf = "medium"
+    else:
+        conf = "low"
+    return code, conf
+
+
+@contextmanager
+def _pdf_on_disk(file_bytes) -> Iterator[str]:
+    """
+    A path pdf2image can render from. Uploads already on disk (see
+    uploads.MappedUpload) are used in place; in-memory ones are written to
+    a temp file once, so each page render does not re-send the document.
+    """
+    path = getattr(file_bytes, "path", None)
+    if path:
+        yield path
+        return
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as pdf_file:
+        pdf_file.write(file_bytes)
+        pdf_file.flush()
+        yield pdf_file.name
+
+
+async def _stream_pdf_ocr(
+    file_bytes: bytes,
+    url: str,
+    first_page: int = 1,
+    last_page: Optional[int] = None,
+    skip_pages: Optional[Set[int]] = None,
+) -> AsyncIterator[Tuple[int, str, float, object]]:
+    """
+    Rasterizes and OCRs a PDF page by page, yielding (page, text, conf, resp_info)
+    in page order. Rasterization of the next page overlaps OCR of earlier ones,
+    and at most OCR_MAX_CONCURRENCY pages are held in memory at a time.
+    Pages in `skip_pages` (e.g. those with a usable text layer) are not OCR'd.
+    """
+    with _pdf_on_disk(file_bytes) as pdf_path:
+        page_count = await asyncio.to_thread(_pdf_page_count, pdf_path)
+
+        in_flight = deque()
+        try:
+            for page_no in _page_span(page_count, first_page, last_page):
+                if skip_pages and page_no in skip_pages:
+                    continue
+                img = await asyncio.to_thread(_rasterize_pdf_page, pdf_path, page_no)
+                if img is None:
+                    continue
+                in_flight.append((page_no, asyncio.create_task(_remote_paddle_ocr(img, url))))
+                del img
+                if len(in_flight) >= OCR_MAX_CONCURRENCY:
+                    done_page, task = in_flight.popleft()
+                    yield (done_page, *await task)
+            while in_flight:
+                done_page, task = in_flight.popleft()
+                yield (done_page, *await task)
+        finally:
+            for _, task in in_flight:
+                task.cancel()
+
+
+async def _stream_image_ocr(img: Image.Image, url: str) -> AsyncIterator[Tuple[int, str, float, object]]:
+    yield (1, *await _remote_paddle_ocr(img, url))
+
+
+def _incomplete_fields(page_error: Optional[str]) -> dict:
+    """Result fields flagging text assembled from only part of the document."""
+    if page_error is None:
+        return {}
+    return {'incomplete': True, 'error': f'Extraction stopped before the last page: {page_error}'}
+
+
+def _confidence_label(avg_conf: float) -> str:
+    if avg_conf >= 0.7:
+        return 'high'
+    elif avg_conf >= 0.35:
+        return 'medium'
+    return 'low'
+
+
+async def stream_text_from_file(
+    file_bytes: bytes,
+    filename: str,
+    first_page: int = 1,
+    last_page: Optional[int] = None,
+) -> AsyncIterator[dict]:
+    """
+    Incremental form of extract_text_from_file, see _stream_text_uncached.
+    Results are cached by SHA-256 of the file plus the extraction settings,
+    so re-uploading the same file replays the stored pages and result.
+    """
+    file_key = _ocr_cache_key(
+        "file",
+        hashlib.sha256(file_bytes).hexdigest(),
+        extension=os.path.splitext(filename.lower())[1],
+        first_page=first_page,
+        last_page=last_page,
+        max_dim=OCR_MAX_DIM,
+        min_text_chars=PDF_PAGE_MIN_TEXT_CHARS,
+        preprocess=OCR_PREPROCESS,
+        binarize=OCR_BINARIZE,
+        encoding=OCR_ENCODING,
+        jpeg_quality=OCR_JPEG_QUALITY,
+        url=os.getenv("PADDLE_OCR_URL"),
+    )
+    cached = ocr_cache.get(file_key)
+    if cached is not None:
+        print(f"DEBUG: OCR cache hit for {filename}")
+        for event in cached["pages"]:
+            yield event
+        yield {'type': 'result', 'result': cached["result"]}
+        return
+
+    page_events = []
+    async for event in _stream_text_uncached(file_bytes, filename, first_page, last_page):
+        if event['type'] == 'page':
+            page_events.append(event)
         else:
-            conf = "low"
-        return code, conf
-    except Exception:
-        return "en", "low"
+            result = event['result']
+            # Only cache clean runs: no pipeline error, no page loop cut short
+            # and no page that OCR'd to nothing.
+            ocr_failed = any(e['method'] == 'paddle_remote' and not e['text'] for e in page_events)
+            if result.get('method') not in ('error', 'unsupported') and not result.get('incomplete') and not ocr_failed:
+                cached_result = {k: v for k, v in result.items() if k != 'remote_responses'}
+                ocr_cache.set(file_key, {"pages": page_events, "result": cached_result})
+        yield event
 
 
-async def extract_text_from_file(file_bytes: bytes, filename: str) -> dict:
+async def _stream_text_uncached(
+    file_bytes: bytes,
+    filename: str,
+    first_page: int = 1,
+    last_page: Optional[int] = None,
+) -> AsyncIterator[dict]:
+    """
+    Incremental form of extract_text_from_file. Yields {"type": "page", ...}
+    with each page's text as soon as it is available (in page order), then a
+    single {"type": "result", "result": {...}} holding the assembled result.
+    `first_page`/`last_page` (1-based, inclusive) select a PDF page range.
+
+    PDFs are routed per page: pages whose text layer has at least
+    PDF_PAGE_MIN_TEXT_CHARS characters are taken as typed text, and only the
+    remaining pages are rasterized and sent to OCR.
+    """
     filename = filename.lower()
     PADDLE_OCR_URL = os.getenv("PADDLE_OCR_URL")
     try:
-        images: List[Image.Image] = []
+        # Pages whose text layer is good enough to skip OCR.
+        typed_pages: Dict[int, str] = {}
+        needs_ocr = True
         if filename.endswith('.pdf'):
-            # Try typed text first
             try:
-                with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
-                    extracted = []
-                    for i, page in enumerate(pdf.pages[:3]):
-                        extracted.append(page.extract_text() or "")
-                    raw_text = "\n".join(extracted).strip()
-                if len(raw_text) > 50:
-                    det_lang, det_conf = _detect_language_summary(raw_text)
-                    return {
-                        'text': raw_text,
-                        'method': 'pdf_text',
-                        'confidence': 'high',
-                        'detected_language': det_lang,
-                        'detection_confidence': det_conf,
-                        'disclaimer': 'This text is machine-extracted and may contain inaccuracies. Please verify before analysis.'
-                    }
+                text_pages = await asyncio.to_thread(_pdf_text_pages, file_bytes, first_page, last_page)
+                typed_pages = {
+                    page_no: text.strip()
+                    for page_no, text in text_pages
+                    if len(text.strip()) >= PDF_PAGE_MIN_TEXT_CHARS
+                }
+                needs_ocr = len(typed_pages) < len(text_pages)
+                print(f"DEBUG: PDF routing: {len(typed_pages)} typed pages, {len(text_pages) - len(typed_pages)} pages for OCR")
             except Exception as e:
                 print(f"DEBUG: pdfplumber text extraction failed: {e}")
-            try:
-                images = _image_from_pdf_bytes(file_bytes, max_pages=3, dpi=150)
-            except Exception as e:
-                print(f"DEBUG: PDF->image conversion failed: {e}")
-                images = []
+            pages = _stream_pdf_ocr(file_bytes, PADDLE_OCR_URL, first_page, last_page, skip_pages=set(typed_pages))
         elif filename.endswith(('.jpg', '.jpeg', '.png')):
-            img = Image.open(io.BytesIO(file_bytes))
-            images = [_resize_image_max(img)]
+            img = await asyncio.to_thread(_open_image_reduced, file_bytes)
+            pages = _stream_image_ocr(img, PADDLE_OCR_URL)
         else:
-            return {'text': '', 'method': 'unsupported', 'error': 'Unsupported file format'}
+            yield {'type': 'result', 'result': {'text': '', 'method': 'unsupported', 'error': 'Unsupported file format'}}
+            return
 
-        if not PADDLE_OCR_URL:
-            return {'text': '', 'method': 'error', 'error': 'PADDLE_OCR_URL not configured in environment'}
+        if needs_ocr and not PADDLE_OCR_URL:
+            if not typed_pages:
+                yield {'type': 'result', 'result': {'text': '', 'method': 'error', 'error': 'PADDLE_OCR_URL not configured in environment'}}
+                return
+            print("DEBUG: PADDLE_OCR_URL not configured; returning typed pages only")
+            needs_ocr = False
 
-        combined_texts = []
+        page_texts: List[Tuple[int, str]] = []
         confidences = []
         remote_responses = []
-        for img in images:
-            text, conf, resp_info = _remote_paddle_ocr(img, PADDLE_OCR_URL)
-            print(f"DEBUG: Remote PaddleOCR produced {len(text)} chars (conf={conf})")
-            remote_responses.append(resp_info)
-            if text:
-                combined_texts.append(text)
-                confidences.append(conf)
-
-        final_text = "\n\n".join([t for t in combined_texts if t])
+        ocr_page_count = 0
+        # Set when the page loop stops early; the result then covers only the pages done.
+        page_error: Optional[str] = None
+        pending_typed = sorted(typed_pages)
+
+        def _typed_pages_before(page_limit: Optional[int]):
+            while pending_typed and (page_limit is None or pending_typed[0] < page_limit):
+                page_no = pending_typed.pop(0)
+                page_texts.append((page_no, typed_pages[page_no]))
+                yield {'type': 'page', 'page': page_no, 'text': typed_pages[page_no], 'method': 'pdf_text'}
+
+        if needs_ocr:
+            try:
+                async for page_no, text, conf, resp_info in pages:
+                    for event in _typed_pages_before(page_no):
+                        yield event
+                    print(f"DEBUG: Remote PaddleOCR produced {len(text)} chars for page {page_no} (conf={conf})")
+                    ocr_page_count += 1
+                    remote_responses.append(resp_info)
+                    if text:
+                        page_texts.append((page_no, text))
+                        confidences.append(conf)
+                    yield {'type': 'page', 'page': page_no, 'text': text, 'method': 'paddle_remote', 'ocr_confidence': conf}
+            except Exception as e:
+                print(f"DEBUG: Page rasterization/OCR failed: {e}")
+                page_error = str(e)
+        for event in _typed_pages_before(None):
+            yield event
+
+        if ocr_page_count == 0 and typed_pages:
+            raw_text = "\n".join(text for _, text in page_texts).strip()
+            det_lang, det_conf = _detect_language_summary(raw_text)
+            yield {'type': 'result', 'result': {
+                'text': raw_text,
+                'method': 'pdf_text',
+                'confidence': 'high',
+                'detected_language': det_lang,
+                'detection_confidence': det_conf,
+                'disclaimer': 'This text is machine-extracted and may contain inaccuracies. Please verify before analysis.',
+                **_incomplete_fields(page_error),
+            }}
+            return
+
+        final_text = "\n\n".join([t for _, t in sorted(page_texts) if t])
+        # Typed pages carry an exact text layer, so they count as fully confident.
+        confidences.extend([1.0] * len(typed_pages))
         avg_conf = float(sum(confidences) / len(confidences)) if confidences else 0.0
-        if avg_conf >= 0.7:
-            conf_label = 'high'
-        elif avg_conf >= 0.35:
-            conf_label = 'medium'
-        else:
-            conf_label = 'low'
+        conf_label = _confidence_label(avg_conf)
 
         det_lang, det_conf = _detect_language_summary(final_text)
         result = {
             'text': final_text,
-            'method': 'paddle_remote',
+            'method': 'pdf_text+paddle_remote' if typed_pages else 'paddle_remote',
             'confidence': conf_label,
             'detected_language': det_lang,
             'detection_confidence': det_conf,
             'disclaimer': 'OCR text may contain inaccuracies. Please verify before analysis.'
         }
+        if typed_pages:
+            result['typed_pages'] = sorted(typed_pages)
+        result.update(_incomplete_fields(page_error))
 
         # Include raw remote responses when debugging is enabled via env flag
         debug_flag = os.getenv('PADDLE_OCR_DEBUG', '').lower() in ('1', 'true', 'yes')
         if debug_flag:
             result['remote_responses'] = remote_responses
 
-        return result
+        yield {'type': 'result', 'result': result}
     except Exception as e:
         print(f"OCR pipeline error: {e}")
-        return {'text': '', 'method': 'error', 'error': str(e)}
\ No newline at end of file
+        yield {'type': 'result', 'result': {'text': '', 'method': 'error', 'error': str(e)}}
+
+
+async def extract_text_from_file(
+    file_bytes: bytes,
+    filename: str,
+    first_page: int = 1,
+    last_page: Optional[int] = None,
+) -> dict:
+    result = {'text': '', 'method': 'error', 'error': 'No extraction result produced'}
+    async for event in stream_text_from_file(file_bytes, filename, first_page, last_page):
+        if event['type'] == 'result':
+            result = event['result']
+    return result
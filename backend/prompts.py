@@ -1,3 +1,4 @@
+import hashlib
 
 EXTRACTION_PROMPT = """
 You are a legal analysis assistant trained to extract FACTUAL EVENTS
@@ -157,3 +158,110 @@ DO NOT:
 - Use speculative language
 - Output anything outside JSON
 """
+
+BATCH_COMPARISON_PROMPT = """
+You are a legal reasoning assistant assisting in cross-examination preparation.
+
+INSTRUCTION: The events and prompts may be in any language. Always RESPOND IN THE SAME
+LANGUAGE AS THE INPUT. Do NOT translate the input or the output. The `explanation` fields
+must be returned in the original language of the events.
+
+You are given several PAIRS of extracted events attributed to the SAME WITNESS,
+recorded at DIFFERENT procedural stages. Judge EACH pair independently.
+
+Your task is NOT to decide truth.
+Your task is ONLY to classify semantic consistency.
+
+====================
+EVENT PAIRS
+====================
+{pairs}
+
+====================
+LEGAL CLASSIFICATION RULES
+====================
+
+Classify the relationship in each pair as EXACTLY ONE of the following:
+
+1. contradiction
+   - Direct conflict in participation or facts
+   - Example:
+     "A assaulted B" vs "A was only standing nearby"
+     "A stabbed B" vs "A did not assault B"
+
+2. omission
+   - One event mentions a fact that the other is silent about
+   - Use ONLY when:
+     - The silence does NOT negate the fact
+     - FIR silence is treated cautiously
+   - Example:
+     FIR mentions assault, later statement adds weapon
+
+3. consistent
+   - Both events assert compatible facts
+   - Minor wording differences allowed
+
+4. minor_discrepancy
+   - Slight differences in:
+     - Time (e.g., 4:00 PM vs 4:30 PM)
+     - Location description
+   - Does NOT affect the core act
+
+====================
+CRITICAL LEGAL GUIDELINES
+====================
+
+- Presence vs participation mismatch → CONTRADICTION
+- Active assault vs passive presence → CONTRADICTION
+- Weapon mismatch → CONTRADICTION or MATERIAL (explain)
+- FIR omissions are COMMON and should NOT automatically be contradictions
+- If unsure, choose the LESS severe classification
+
+====================
+OUTPUT FORMAT (STRICT)
+====================
+
+Return ONLY valid JSON with ONE entry per pair, copying the IDs exactly:
+
+{{
+  "comparisons": [
+    {{
+      "event_1_id": "...",
+      "event_2_id": "...",
+      "classification": "contradiction | omission | consistent | minor_discrepancy",
+      "explanation": "Brief legal reasoning (1–2 sentences)"
+    }}
+  ]
+}}
+
+DO NOT:
+- Mention guilt or credibility
+- Use speculative language
+- Output anything outside JSON
+"""
+
+BATCH_COMPARISON_PAIR_TEMPLATE = """
+--- PAIR {index} ---
+EVENT 1 ({type_1}) event_1_id: {event_1_id}
+Actor: {actor_1}
+Action: {action_1}
+Target: {target_1}
+Time: {time_1}
+Location: {location_1}
+
+EVENT 2 ({type_2}) event_2_id: {event_2_id}
+Actor: {actor_2}
+Action: {action_2}
+Target: {target_2}
+Time: {time_2}
+Location: {location_2}
+"""
+
+
+def prompt_version(prompt: str) -> str:
+    """Short fingerprint of a prompt template, used to invalidate cached LLM output when it changes."""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+
+
+EXTRACTION_PROMPT_VERSION = prompt_version(EXTRACTION_PROMPT)
+COMPARISON_PROMPT_VERSION = prompt_version(COMPARISON_PROMPT + BATCH_COMPARISON_PROMPT + BATCH_COMPARISON_PAIR_TEMPLATE)
@@ -29,13 +29,14 @@ def group_and_prioritize_rows(rows: List[ReportRow]) -> List[ReportRow]:
     
     return final_rows
 
-def generate_final_report(rows: List[ReportRow], input_language: str = "en") -> AnalysisReport:
+def generate_final_report(rows: List[ReportRow], input_language: str = "en", prioritize: bool = True) -> AnalysisReport:
     """
     Aggregates the rows and adds the disclaimer.
+    Pass prioritize=False when rows were already prioritized by the caller.
     """
     
     # Apply Post-Processing
-    processed_rows = group_and_prioritize_rows(rows)
+    processed_rows = group_and_prioritize_rows(rows) if prioritize else rows
     
     disclaimer = (
         "DISCLAIMER: This report is generated by an AI system (Sakshya AI) for preliminary analysis only. "
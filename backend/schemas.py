@@ -62,6 +62,21 @@ class AnalyzeRequest(BaseModel):
     statement_1_type: str
     statement_2_text: str
     statement_2_type: str
+    # Text of the previous analysis of each statement, if the user edited
+    # it since; only the changed sentences are re-extracted.
+    previous_statement_1_text: Optional[str] = None
+    previous_statement_2_text: Optional[str] = None
+
+
+class StatementInput(BaseModel):
+    text: str
+    statement_type: str
+
+
+class MultiAnalyzeRequest(BaseModel):
+    """All recorded statements of one witness, e.g. FIR, 161, 164 and deposition."""
+
+    statements: List[StatementInput] = Field(..., min_length=2)
 
 
 class SpeechToTextResponse(BaseModel):
@@ -85,3 +100,21 @@ class SpeechToTextResponse(BaseModel):
         description="Approximate duration of the processed audio clip.",
     )
 
+
+
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "completed", "failed"]
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "completed", "failed"]
+    created_at: float
+    updated_at: float
+    progress: Optional[dict] = Field(
+        default=None,
+        description="Latest pipeline progress event (extraction / pairs compared).",
+    )
+    error: Optional[str] = None
+    report: Optional[AnalysisReport] = None
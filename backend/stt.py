@@ -0,0 +1,436 @@
+import asyncio
+import io
+import math
+import re
+import shutil
+import wave
+from typing import AsyncIterator, List, Optional, Tuple
+
+import httpx
+import numpy as np
+from fastapi import HTTPException
+
+from config import (
+    SARVAM_API_KEY,
+    SARVAM_STT_URL,
+    SARVAM_STT_MODEL,
+    STT_SEGMENT_SECONDS,
+    STT_SEGMENT_OVERLAP_SECONDS,
+    STT_MAX_CONCURRENCY,
+    STT_TIMEOUT_SECONDS,
+)
+
+# Audio is decoded to 16 kHz mono 16-bit PCM for segmentation.
+SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.02
+# How far before a segment's target end to look for a quiet cut point.
+SILENCE_SEARCH_SECONDS = 5.0
+# Size of the slices an upload is piped to ffmpeg in, and of the decoded
+# chunks segmentation works on (10 s of audio).
+FFMPEG_FEED_BYTES = 1024 * 1024
+PCM_CHUNK_SAMPLES = 10 * SAMPLE_RATE
+# Segments decoded but not yet transcribed; bounds memory for long recordings.
+STT_MAX_PENDING_SEGMENTS = 2 * STT_MAX_CONCURRENCY
+
+# ffmpeg decodes any recording format (the frontend records WebM/Opus).
+# Without it only PCM WAV can be split, and everything else is sent to STT
+# as a single request.
+FFMPEG_PATH = shutil.which("ffmpeg")
+if not FFMPEG_PATH:
+    print("WARNING: ffmpeg not found on PATH. Long non-WAV recordings will not be split for speech-to-text; see DEPLOYMENT.md.")
+
+# Shared keep-alive client for the STT host, created on first use.
+_stt_client: Optional[httpx.AsyncClient] = None
+_stt_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _get_stt_client() -> Tuple[httpx.AsyncClient, asyncio.Semaphore]:
+    global _stt_client, _stt_semaphore
+    if _stt_client is None:
+        _stt_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=STT_MAX_CONCURRENCY,
+                max_keepalive_connections=STT_MAX_CONCURRENCY,
+            ),
+            timeout=STT_TIMEOUT_SECONDS,
+        )
+        _stt_semaphore = asyncio.Semaphore(STT_MAX_CONCURRENCY)
+    return _stt_client, _stt_semaphore
+
+
+async def close_stt_client() -> None:
+    global _stt_client, _stt_semaphore
+    if _stt_client is not None:
+        await _stt_client.aclose()
+    _stt_client = None
+    _stt_semaphore = None
+
+
+# --- Transcription of a single clip ---
+
+async def transcribe_clip(audio, filename: str, content_type: str) -> dict:
+    """
+    Sends one audio clip (bytes or a binary file object) to Sarvam STT and
+    returns the parsed response fields. Raises HTTPException(502) on failure.
+    """
+    # Match Sarvam curl example:
+    # curl -X POST https://api.sarvam.ai/speech-to-text \
+    #   -H "api-subscription-key: <apiKey>" \
+    #   -H "Content-Type: multipart/form-data" \
+    #   -F file=@<path>
+    headers = {
+        "api-subscription-key": SARVAM_API_KEY,
+    }
+    files = {"file": (filename, audio, content_type)}
+
+    client, semaphore = _get_stt_client()
+    # Basic STT call as per docs – no extra form fields required.
+    async with semaphore:
+        resp = await client.post(SARVAM_STT_URL, headers=headers, files=files)
+
+    if resp.status_code != 200:
+        try:
+            err_body = resp.json()
+        except Exception:
+            err_body = resp.text
+        raise HTTPException(
+            status_code=502,
+            detail=f"Sarvam STT request failed with status {resp.status_code}: {err_body}",
+        )
+
+    try:
+        payload = resp.json()
+    except Exception as e:  # pragma: no cover - defensive
+        raise HTTPException(status_code=502, detail=f"Invalid JSON from Sarvam STT: {e}")
+
+    # Try common field names for the transcribed text.
+    text = (
+        payload.get("text")
+        or payload.get("transcript")
+        or payload.get("transcription")
+        or payload.get("output_text")
+        or ""
+    )
+    return {
+        "text": text.strip(),
+        "detected_language": payload.get("language") or payload.get("detected_language"),
+        "model": payload.get("model") or SARVAM_STT_MODEL,
+        "duration_seconds": payload.get("duration") or payload.get("duration_seconds"),
+    }
+
+
+# --- Decoding and silence-based segmentation ---
+
+class AudioDecodeError(Exception):
+    """The recording could not be decoded locally."""
+
+
+async def iter_pcm(audio) -> AsyncIterator[np.ndarray]:
+    """
+    Decodes audio (bytes or a memory-mapped upload) to 16 kHz mono int16
+    samples, yielded in chunks of about PCM_CHUNK_SAMPLES so memory use does
+    not grow with the recording's length. Uses ffmpeg when available (any
+    container/codec), otherwise only plain PCM WAV. Raises AudioDecodeError
+    if the audio cannot be decoded, possibly after some chunks.
+    """
+    if FFMPEG_PATH:
+        async for chunk in _iter_pcm_ffmpeg(audio):
+            yield chunk
+        return
+
+    wav = await asyncio.to_thread(_open_wav, audio)
+    if wav is None:
+        print("DEBUG: ffmpeg not installed and audio is not PCM WAV; sending it to STT unsegmented")
+        raise AudioDecodeError("audio is not PCM WAV and ffmpeg is not installed")
+    with wav:
+        channels, rate = wav.getnchannels(), wav.getframerate()
+        # Whole blocks of rate/g input frames resample to exactly
+        # SAMPLE_RATE/g samples, so chunks join without drift.
+        block = rate // math.gcd(rate, SAMPLE_RATE)
+        frames_per_chunk = max(1, PCM_CHUNK_SAMPLES * rate // SAMPLE_RATE // block) * block
+        while True:
+            raw = await asyncio.to_thread(wav.readframes, frames_per_chunk)
+            if not raw:
+                break
+            yield _to_mono_16k(raw, channels, rate)
+
+
+async def _feed_stdin(proc: asyncio.subprocess.Process, audio) -> None:
+    # Stream the upload in slices so a memory-mapped file is never
+    # copied whole into memory.
+    try:
+        for offset in range(0, len(audio), FFMPEG_FEED_BYTES):
+            proc.stdin.write(audio[offset:offset + FFMPEG_FEED_BYTES])
+            await proc.stdin.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass  # ffmpeg gave up early; its exit status reports why
+    finally:
+        proc.stdin.close()
+
+
+async def _iter_pcm_ffmpeg(audio) -> AsyncIterator[np.ndarray]:
+    proc = await asyncio.create_subprocess_exec(
+        FFMPEG_PATH, "-v", "error", "-i", "pipe:0",
+        "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    feeder = asyncio.create_task(_feed_stdin(proc, audio))
+    stderr_reader = asyncio.create_task(proc.stderr.read())
+    chunk_bytes = PCM_CHUNK_SAMPLES * 2
+    pending = bytearray()
+    try:
+        while True:
+            data = await proc.stdout.read(chunk_bytes)
+            if data:
+                pending += data
+                if len(pending) < chunk_bytes:
+                    continue
+            usable = len(pending) - len(pending) % 2
+            if usable:
+                yield np.frombuffer(bytes(pending[:usable]), dtype=np.int16)
+                del pending[:usable]
+            if not data:
+                break
+        await feeder
+        stderr = await stderr_reader
+        await proc.wait()
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+        feeder.cancel()
+        stderr_reader.cancel()
+    if proc.returncode != 0:
+        detail = stderr.decode(errors="ignore").strip()[:200]
+        print(f"DEBUG: ffmpeg decode failed: {detail}")
+        raise AudioDecodeError(detail or f"ffmpeg exited with status {proc.returncode}")
+
+
+def _open_wav(audio) -> Optional[wave.Wave_read]:
+    # mmap is file-like, so wave reads it in place; bytes need a wrapper.
+    source = io.BytesIO(audio) if isinstance(audio, (bytes, bytearray)) else audio
+    try:
+        source.seek(0)
+        wav = wave.open(source)
+    except (wave.Error, EOFError):
+        return None
+    if wav.getsampwidth() != 2:
+        wav.close()
+        return None
+    return wav
+
+
+def _to_mono_16k(raw: bytes, channels: int, rate: int) -> np.ndarray:
+    samples = np.frombuffer(raw, dtype=np.int16)
+    if channels > 1:
+        samples = samples[: len(samples) // channels * channels]
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    if rate != SAMPLE_RATE:
+        # Linear resampling is plenty for locating silences and for speech STT.
+        target_len = int(len(samples) * SAMPLE_RATE / rate)
+        positions = np.linspace(0, len(samples) - 1, target_len)
+        samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.int16)
+    return samples
+
+
+def _quiet_cut(buffer: np.ndarray, offset: int, start: int, segment_len: int) -> int:
+    """
+    Cut point for the segment starting at sample `start`: the middle of the
+    quietest frame in the SILENCE_SEARCH_SECONDS before the target length,
+    preferring the latest on ties to keep segments near full length.
+    `buffer` holds the samples from absolute position `offset` on.
+    """
+    frame = int(FRAME_SECONDS * SAMPLE_RATE)
+    search_frames = int(SILENCE_SEARCH_SECONDS / FRAME_SECONDS)
+    target_frame = (start + segment_len) // frame
+    lo = max(target_frame - search_frames, start // frame + 1)
+    hi = min(target_frame + 1, (offset + len(buffer)) // frame)
+    frames = buffer[lo * frame - offset:hi * frame - offset].astype(np.float32).reshape(-1, frame)
+    energy = np.sqrt(np.mean(frames ** 2, axis=1))
+    quietest = lo + len(energy) - 1 - int(np.argmin(energy[::-1]))
+    return quietest * frame + frame // 2
+
+
+async def stream_segments(
+    chunks: AsyncIterator[np.ndarray],
+    segment_seconds: float = STT_SEGMENT_SECONDS,
+    overlap_seconds: float = STT_SEGMENT_OVERLAP_SECONDS,
+) -> AsyncIterator[Tuple[int, int, np.ndarray]]:
+    """
+    Splits streamed PCM chunks into (start, end, samples) segments of at
+    most about `segment_seconds`, each yielded as soon as its audio has
+    arrived; only about one segment of audio is buffered. Cuts are placed
+    by _quiet_cut, so they fall between words, and every segment is padded
+    by `overlap_seconds` on both sides, so a word at a cut is heard in full
+    by at least one segment.
+    """
+    segment_len = int(segment_seconds * SAMPLE_RATE)
+    overlap = int(overlap_seconds * SAMPLE_RATE)
+    # Audio needed past a segment's target end to place and pad its cut.
+    lookahead = int(FRAME_SECONDS * SAMPLE_RATE) + overlap
+
+    buffer = np.empty(0, dtype=np.int16)
+    offset = 0  # absolute position of buffer[0]
+    start = 0   # absolute position of the current segment's cut
+
+    def segment(end: int) -> Tuple[int, int, np.ndarray]:
+        lo = max(start - overlap, 0)
+        return lo, end, buffer[lo - offset:end - offset].copy()
+
+    async for chunk in chunks:
+        buffer = np.concatenate((buffer, chunk))
+        while offset + len(buffer) - start > segment_len + lookahead:
+            cut = _quiet_cut(buffer, offset, start, segment_len)
+            yield segment(cut + overlap)
+            start = cut
+            drop = max(start - overlap, 0) - offset
+            buffer = buffer[drop:]
+            offset += drop
+
+    total = offset + len(buffer)
+    while total - start > segment_len:
+        cut = _quiet_cut(buffer, offset, start, segment_len)
+        yield segment(min(cut + overlap, total))
+        start = cut
+    yield segment(total)
+
+
+def _encode_wav(samples: np.ndarray) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(samples.tobytes())
+    return buf.getvalue()
+
+
+# --- Stitching ---
+
+def _normalize_word(word: str) -> str:
+    return re.sub(r"[^\w]", "", word.lower())
+
+
+def stitch_transcripts(previous: str, current: str, max_overlap_words: int = 8) -> str:
+    """
+    Drops the words at the start of `current` that repeat the end of
+    `previous`. Segments overlap in time, so the same words can appear at
+    the end of one transcript and the start of the next.
+    """
+    prev_words = [_normalize_word(w) for w in previous.split()]
+    cur_raw = current.split()
+    cur_words = [_normalize_word(w) for w in cur_raw]
+    limit = min(max_overlap_words, len(prev_words), len(cur_words))
+    for k in range(limit, 0, -1):
+        if prev_words[-k:] == cur_words[:k]:
+            return " ".join(cur_raw[k:])
+    return current
+
+
+# --- Pipeline ---
+
+async def stream_transcription(audio, filename: str, content_type: str) -> AsyncIterator[dict]:
+    """
+    Transcribes an uploaded recording. Short clips (or audio that cannot be
+    decoded locally) go to Sarvam in one request. Long recordings are
+    decoded and split on silences as they stream, and the segments are
+    transcribed concurrently, with at most STT_MAX_PENDING_SEGMENTS held in
+    memory at a time.
+
+    Yields {"type": "segment", ...} as each segment finishes (any order, with
+    its index and time range), then {"type": "result", ...} with the
+    stitched transcript.
+    """
+    segments = stream_segments(iter_pcm(audio))
+    # Hold back the first segment until a second one shows the clip is long.
+    head: List[Tuple[int, int, np.ndarray]] = []
+    try:
+        async for item in segments:
+            head.append(item)
+            if len(head) == 2:
+                break
+    except AudioDecodeError:
+        head = []
+    if len(head) < 2:
+        await segments.aclose()
+        result = await transcribe_clip(audio, filename, content_type)
+        yield {"type": "segment", "index": 0, "start": 0.0, "end": result["duration_seconds"], "text": result["text"]}
+        yield {"type": "result", **result}
+        return
+
+    async def _run(index: int, samples: np.ndarray) -> Tuple[int, dict]:
+        wav_bytes = await asyncio.to_thread(_encode_wav, samples)
+        return index, await transcribe_clip(wav_bytes, f"segment_{index}.wav", "audio/wav")
+
+    async def _all_segments():
+        while head:
+            yield head.pop(0)
+        async for item in segments:
+            yield item
+
+    bounds: List[Tuple[int, int]] = []
+    results: dict = {}
+    in_flight: set = set()
+
+    def _finished(done) -> List[dict]:
+        events = []
+        for task in done:
+            index, result = task.result()
+            results[index] = result
+            start, end = bounds[index]
+            events.append({
+                "type": "segment",
+                "index": index,
+                "start": round(start / SAMPLE_RATE, 2),
+                "end": round(end / SAMPLE_RATE, 2),
+                "text": result["text"],
+            })
+        return events
+
+    try:
+        async for start, end, samples in _all_segments():
+            bounds.append((start, end))
+            in_flight.add(asyncio.create_task(_run(len(bounds) - 1, samples)))
+            del samples
+            while len(in_flight) >= STT_MAX_PENDING_SEGMENTS:
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for event in _finished(done):
+                    yield event
+        print(f"DEBUG: STT split {bounds[-1][1] / SAMPLE_RATE:.1f}s of audio into {len(bounds)} segments")
+        while in_flight:
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for event in _finished(done):
+                yield event
+    except AudioDecodeError as e:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Recording could not be decoded past {bounds[-1][1] / SAMPLE_RATE:.0f}s: {e}",
+        )
+    finally:
+        for task in in_flight:
+            task.cancel()
+        await segments.aclose()
+
+    ordered = [results[i] for i in range(len(bounds))]
+    text = ""
+    for result in ordered:
+        piece = stitch_transcripts(text, result["text"]) if text else result["text"]
+        text = f"{text} {piece}".strip() if piece else text
+
+    yield {
+        "type": "result",
+        "text": text,
+        "detected_language": next((r["detected_language"] for r in ordered if r["detected_language"]), None),
+        "model": ordered[0]["model"],
+        "duration_seconds": round(bounds[-1][1] / SAMPLE_RATE, 2),
+    }
+
+
+async def transcribe_audio(audio, filename: str, content_type: str) -> dict:
+    result = {}
+    async for event in stream_transcription(audio, filename, content_type):
+        if event["type"] == "result":
+            result = event
+    return result
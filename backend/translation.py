@@ -1,10 +1,13 @@
-from langdetect import detect
+from typing import Tuple
+
+import numpy as np
+from langdetect import DetectorFactory, detect_langs
 from langdetect.lang_detect_exception import LangDetectException
-import google.generativeai as genai
-from config import GEMINI_API_KEY, GEMINI_MODEL_NAME
+from config import GEMINI_API_KEY
+from llm import generate_text
 
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+# langdetect is probabilistic; a fixed seed makes the Latin fallback repeatable.
+DetectorFactory.seed = 0
 
 # Supported Indian languages + English
 SUPPORTED_LANGUAGES = {
@@ -17,24 +20,86 @@ SUPPORTED_LANGUAGES = {
     "bn": "Bengali"
 }
 
+# Unicode blocks of the scripts that identify a supported language on their
+# own, plus the Latin letters that need langdetect to tell languages apart.
+# Ranges are sorted and non-overlapping: (first code point, last, label).
+SCRIPT_RANGES = [
+    (0x0041, 0x005A, "latin"),
+    (0x0061, 0x007A, "latin"),
+    (0x00C0, 0x024F, "latin"),
+    # Devanagari, minus danda and double danda (U+0964/U+0965): Bengali
+    # sentences end with them too, so they count as neutral punctuation.
+    (0x0900, 0x0963, "hi"),
+    (0x0966, 0x097F, "hi"),
+    (0x0980, 0x09FF, "bn"),  # Bengali
+    (0x0B80, 0x0BFF, "ta"),  # Tamil
+    (0x0C00, 0x0C7F, "te"),  # Telugu
+    (0x0C80, 0x0CFF, "kn"),  # Kannada
+    (0x0D00, 0x0D7F, "ml"),  # Malayalam
+]
+
+# Bin edges for np.searchsorted: code points in range i land in bin 2*i + 1,
+# everything else (digits, punctuation, other scripts) in an even bin.
+_SCRIPT_EDGES = np.array(
+    [edge for lo, hi, _ in SCRIPT_RANGES for edge in (lo, hi + 1)], dtype=np.uint32
+)
+_SCRIPT_LABELS = [label for _, _, label in SCRIPT_RANGES]
+
+
+def _script_counts(text: str) -> dict:
+    """Number of code points of `text` in each script of SCRIPT_RANGES."""
+    code_points = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    bins = np.searchsorted(_SCRIPT_EDGES, code_points, side="right")
+    hist = np.bincount(bins, minlength=len(_SCRIPT_EDGES) + 1)
+    counts = {}
+    for i, label in enumerate(_SCRIPT_LABELS):
+        counts[label] = counts.get(label, 0) + int(hist[2 * i + 1])
+    return counts
+
+
+def detect_language_with_confidence(text: str) -> Tuple[str, float]:
+    """
+    Returns (ISO code, confidence in [0, 1]) for `text`.
+
+    Text written mostly in an Indic script is identified by the script alone,
+    with the script's share of all letters as the confidence. Only Latin
+    text goes through langdetect; languages outside SUPPORTED_LANGUAGES are
+    reported as English with zero confidence.
+    """
+    counts = _script_counts(text)
+    letters = sum(counts.values())
+    if letters == 0:
+        return "en", 0.0
+
+    script = max(counts, key=counts.get)
+    if script != "latin":
+        return script, counts[script] / letters
+
+    try:
+        top = detect_langs(text)[0]
+    except (LangDetectException, IndexError):
+        return "en", 0.0
+    if top.lang not in SUPPORTED_LANGUAGES:
+        return "en", 0.0
+    return top.lang, top.prob
+
+
 def detect_language(text: str) -> str:
     """
-    Detects language using langdetect library.
+    Detects the language of `text` from its Unicode scripts.
     Returns ISO code (e.g., 'en', 'hi', 'ml').
     Default to 'en' on failure or short text.
     """
     if not text or len(text.strip()) < 10:
         return "en"
-    
-    try:
-        lang = detect(text)
-        # Check if supported, otherwise treat as English (or handle error)
-        # For now, we trust the detector but only act if it's one of our target Indic languages
-        if lang in SUPPORTED_LANGUAGES:
-            return lang
-        return "en" # Fallback for unknown langs to English processing
-    except LangDetectException:
+
+    counts = _script_counts(text)
+    script = max(counts, key=counts.get)
+    if counts[script] == 0 or script == "latin":
+        # Only English is supported among Latin-script languages, so there is
+        # no need to ask langdetect which one this is.
         return "en"
+    return script
 
 async def translate_to_english(text: str, source_lang: str) -> str:
     """
@@ -47,8 +112,6 @@ async def translate_to_english(text: str, source_lang: str) -> str:
         print("WARNING: No API Key for translation. Returning original text.")
         return text
 
-    model = genai.GenerativeModel(GEMINI_MODEL_NAME)
-    
     prompt = f"""You are a professional legal translator. 
     Translate the following {SUPPORTED_LANGUAGES.get(source_lang, source_lang)} legal text into English.
     Preserve the legal meaning, sentence structure, and tone.
@@ -59,8 +122,8 @@ async def translate_to_english(text: str, source_lang: str) -> str:
     """
 
     try:
-        response = model.generate_content(prompt)
-        return response.text.strip()
+        response_text = await generate_text(prompt)
+        return response_text.strip()
     except Exception as e:
         print(f"Translation Error (to English): {e}")
         return text # Fail safe: return original
@@ -75,8 +138,6 @@ async def translate_text(text: str, target_lang: str) -> str:
     if not GEMINI_API_KEY:
         return text
 
-    model = genai.GenerativeModel(GEMINI_MODEL_NAME)
-    
     target_lang_name = SUPPORTED_LANGUAGES.get(target_lang, target_lang)
     
     prompt = f"""Translate the following text into {target_lang_name}.
@@ -87,8 +148,8 @@ async def translate_text(text: str, target_lang: str) -> str:
     """
 
     try:
-        response = model.generate_content(prompt)
-        return response.text.strip()
+        response_text = await generate_text(prompt)
+        return response_text.strip()
     except Exception as e:
         print(f"Translation Error (to {target_lang}): {e}")
         return text
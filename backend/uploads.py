@@ -0,0 +1,101 @@
+import mmap
+import os
+from contextlib import contextmanager
+from typing import Iterator, Optional, Union
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+from config import MAX_UPLOAD_BYTES, UPLOAD_SPOOL_BYTES
+
+class MappedUpload(mmap.mmap):
+    """A memory-mapped upload; `path` opens the same file on disk, if it can be reached by path."""
+
+    path: Optional[str] = None
+
+
+UploadBuffer = Union[bytes, MappedUpload]
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Rejects request bodies over `max_bytes` with 413. A too-large
+    Content-Length is refused before any body is read. Chunked uploads are
+    counted while they stream in and cut off as soon as they pass the limit.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_UPLOAD_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"Upload exceeds the {self.max_bytes // (1024 * 1024)} MB limit"
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            response = JSONResponse({"detail": detail}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Re-raised by FastAPI's body parsing and rendered as a 413.
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def _file_path(fileobj) -> Optional[str]:
+    name = getattr(fileobj, "name", None)
+    if isinstance(name, str) and os.path.isfile(name):
+        return name
+    # Anonymous temp files (Starlette's spool on Linux) are still reachable
+    # through procfs, also from child processes such as pdftoppm.
+    proc_path = f"/proc/{os.getpid()}/fd/{fileobj.fileno()}"
+    return proc_path if os.path.exists(proc_path) else None
+
+
+def _upload_size(file: UploadFile) -> int:
+    if file.size is not None:
+        return file.size
+    file.file.seek(0, 2)
+    return file.file.tell()
+
+
+@contextmanager
+def upload_buffer(file: UploadFile, spool_bytes: int = UPLOAD_SPOOL_BYTES) -> Iterator[UploadBuffer]:
+    """
+    Exposes an upload's contents without copying it into a new bytes object.
+    Uploads larger than `spool_bytes` are memory-mapped from disk; the OS
+    pages them in on demand, and concurrent large uploads share the page
+    cache, and tools that need a file can open `path` instead of writing a
+    copy. Smaller uploads are returned as bytes.
+    """
+    size = _upload_size(file)
+    spooled = file.file
+    spooled.seek(0)
+    if size <= spool_bytes:
+        yield spooled.read() if size else b""
+        return
+    # Starlette spools file parts to a SpooledTemporaryFile; make sure this
+    # one is on disk (a no-op if it already is) so it can be mapped.
+    rollover = getattr(spooled, "rollover", None)
+    if rollover is not None:
+        rollover()
+    buffer = MappedUpload(spooled.fileno(), 0, access=mmap.ACCESS_READ)
+    buffer.path = _file_path(spooled)
+    try:
+        yield buffer
+    finally:
+        buffer.close()
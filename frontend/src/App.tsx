@@ -1,5 +1,5 @@
 import { useRef, useState } from 'react';
-import type { AnalysisReport } from './types';
+import type { AnalysisReport, AnalysisStreamEvent, AnalyzeRequest, ReportRow } from './types';
 import ConfrontationTable from './components/ConfrontationTable';
 import './index.css';
 import Login from './components/Login';
@@ -18,6 +18,11 @@ function App() {
   const [s2Type, setS2Type] = useState("Section 161");
   const [loading, setLoading] = useState(false);
   const [report, setReport] = useState<AnalysisReport | null>(null);
+  // Rows and progress streamed from /analyze/stream before the final report arrives
+  const [partialRows, setPartialRows] = useState<ReportRow[]>([]);
+  const [progress, setProgress] = useState<{ compared: number; total: number } | null>(null);
+  // Texts of the last successful analysis, sent back so edits are re-analyzed incrementally
+  const lastAnalyzed = useRef<AnalyzeRequest | null>(null);
 
   // Audio recording state
   const [recordingTarget, setRecordingTarget] = useState<'s1' | 's2' | null>(null);
@@ -208,25 +213,69 @@ function App() {
   const handleAnalyze = async () => {
     setLoading(true);
     setReport(null);
+    setPartialRows([]);
+    setProgress(null);
     try {
-      const response = await fetch(`${API_BASE}/analyze`, {
+      const request: AnalyzeRequest = {
+        statement_1_text: s1Text,
+        statement_1_type: s1Type,
+        statement_2_text: s2Text,
+        statement_2_type: s2Type,
+      };
+      const previous = lastAnalyzed.current;
+      if (previous && previous.statement_1_type === s1Type && previous.statement_2_type === s2Type) {
+        request.previous_statement_1_text = previous.statement_1_text;
+        request.previous_statement_2_text = previous.statement_2_text;
+      }
+
+      const response = await fetch(`${API_BASE}/analyze/stream`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         },
-        body: JSON.stringify({
-          statement_1_text: s1Text,
-          statement_1_type: s1Type,
-          statement_2_text: s2Text,
-          statement_2_type: s2Type,
-        }),
+        body: JSON.stringify(request),
       });
 
-      if (!response.ok) throw new Error("Analysis failed");
+      if (!response.ok || !response.body) throw new Error("Analysis failed");
+
+      // NDJSON: one event per line, rows arrive as soon as they are found
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let data: AnalysisReport | null = null;
+
+      while (true) {
+        const { done, value } = await reader.read();
+        buffer += decoder.decode(value, { stream: !done });
+        const lines = buffer.split("\n");
+        // Keep a trailing partial line for the next chunk
+        buffer = done ? "" : lines.pop() ?? "";
+
+        for (const line of lines) {
+          if (!line.trim()) continue;
+          const event: AnalysisStreamEvent = JSON.parse(line);
+          if (event.type === 'progress') {
+            setProgress({ compared: event.compared, total: event.total });
+          } else if (event.type === 'row') {
+            setPartialRows(rows => [...rows, event.row]);
+          } else if (event.type === 'report') {
+            data = event.report;
+          } else if (event.type === 'error') {
+            throw new Error(event.detail);
+          }
+        }
+        if (done) break;
+      }
 
-      const data = await response.json();
+      if (!data) throw new Error("Analysis stream ended without a report");
       console.log("DEBUG: Received Analysis Report:", data);
       setReport(data);
+      lastAnalyzed.current = {
+        statement_1_text: s1Text,
+        statement_1_type: s1Type,
+        statement_2_text: s2Text,
+        statement_2_type: s2Type,
+      };
 
       // Save history if logged in
       if (user) {
@@ -238,6 +287,8 @@ function App() {
       alert(`Error analyzing statements: ${(error as Error).message}. Check console for details.`);
     } finally {
       setLoading(false);
+      setPartialRows([]);
+      setProgress(null);
     }
   };
 
@@ -455,7 +506,15 @@ function App() {
         {loading && (
           <div className="flex flex-col items-center justify-center py-24 space-y-6">
             <div className="animate-spin rounded-full h-16 w-16 border-t-2 border-b-2 border-blue-500"></div>
-            <div className="text-slate-400 animate-pulse">Analyzing semantic discrepancies...</div>
+            <div className="text-slate-400 animate-pulse">
+              Analyzing semantic discrepancies...
+              {progress && progress.total > 0 && ` (${progress.compared}/${progress.total} pairs compared)`}
+            </div>
+            {partialRows.length > 0 && (
+              <div className="w-full">
+                <ConfrontationTable rows={partialRows} />
+              </div>
+            )}
           </div>
         )}
 
@@ -15,11 +15,21 @@ export interface AnalysisReport {
     disclaimer: string;
 }
 
+export type AnalysisStreamEvent =
+    | { type: "extraction"; events_1: number; events_2: number }
+    | { type: "progress"; compared: number; total: number }
+    | { type: "row"; row: ReportRow }
+    | { type: "report"; report: AnalysisReport }
+    | { type: "error"; detail: string };
+
 export interface AnalyzeRequest {
     statement_1_text: string;
     statement_1_type: string;
     statement_2_text: string;
     statement_2_type: string;
+    // Previously analyzed text, so the backend only re-extracts edited sentences
+    previous_statement_1_text?: string;
+    previous_statement_2_text?: string;
 }
 
 export interface AnalysisHistoryItem {